@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark of MIXADS8568SG acquisition hot paths against the simulated ipcore.
+
+Examples:
+    python bench_mix_ads8568_sg.py --output new.json
+    python bench_mix_ads8568_sg.py --output new.json --baseline old.json --threshold 0.2
+'''
+import sys
+import json
+import time
+import platform
+import argparse
+from mix.driver.smartgiant.common.ipcore import mix_ads8568_sg
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGTiming
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGSampleBuffer
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_sim import MIXADS8568SGSim
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_sim import sine_wave
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+class MIXADS8568SGBenchDef:
+    DURATION = 0.2  # s, run time of one case
+    THRESHOLD = 0.2  # allowed slowdown of us_per_sample, 0.2 means 20%
+    SCAN_CHANNELS = {1: [1], 2: [1, 2], 4: [1, 3, 5, 7], 8: [1, 2, 3, 4, 5, 6, 7, 8]}
+    STREAM_BLOCK = 64
+    BATCH_SIZE = 1024
+    METRIC = 'us_per_sample'
+
+
+class TimeSplit(object):
+    '''
+    TimeSplit measures time spent in time.sleep and in spin waits of the driver while active.
+
+    time.sleep is patched globally, precise_delay and wait_conv_done of the driver are wrapped. A spin
+    is the wait time minus the sleeps inside it, so nothing is counted twice.
+
+    '''
+
+    def __init__(self, ads8568):
+        self.ads8568 = ads8568
+        self.sleep = 0.0
+        self.spin = 0.0
+
+    def __enter__(self):
+        self._sleep = time.sleep
+        self._precise_delay = mix_ads8568_sg.precise_delay
+        self._wait_conv_done = self.ads8568.wait_conv_done
+
+        def sleep(seconds):
+            start = time.perf_counter()
+            self._sleep(seconds)
+            self.sleep += time.perf_counter() - start
+
+        def timed(func):
+            def wrapper(*args, **kwargs):
+                sleep_before = self.sleep
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.spin += time.perf_counter() - start - (self.sleep - sleep_before)
+            return wrapper
+
+        time.sleep = sleep
+        mix_ads8568_sg.precise_delay = timed(self._precise_delay)
+        self.ads8568.wait_conv_done = timed(self._wait_conv_done)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        time.sleep = self._sleep
+        mix_ads8568_sg.precise_delay = self._precise_delay
+        del self.ads8568.wait_conv_done
+        return False
+
+
+def create_bench_driver(timing):
+    '''
+    Create an initialized MIXADS8568SG on the simulated ipcore.
+
+    Args:
+        timing:    string, ['conservative', 'datasheet'], timing profile.
+
+    Returns:
+        (MIXADS8568SGSim, MIXADS8568SG), tuple.
+
+    '''
+    sim = MIXADS8568SGSim()
+    for ch in MIXADS8568SGDef.CHANNEL:
+        sim.set_input(ch, sine_wave(ch, 50 * ch))
+    ads8568 = sim.create_driver(timing=MIXADS8568SGTiming(timing))
+    ads8568.init_dev('sw')
+    return sim, ads8568
+
+
+def bench_cases(sim, ads8568):
+    '''
+    Benchmark cases, name: (function of one call, samples of one call).
+
+    '''
+    codes = [0x1234FF78] * MIXADS8568SGBenchDef.BATCH_SIZE
+    buffer = MIXADS8568SGSampleBuffer(MIXADS8568SGBenchDef.SCAN_CHANNELS[8], MIXADS8568SGBenchDef.STREAM_BLOCK)
+    cases = {
+        'read_ch': (lambda: ads8568.read_ch(1), 1),
+        'read_all_ch_data': (ads8568.read_all_ch_data, 8),
+        '_code_2_mvolt': (lambda: ads8568._code_2_mvolt(0x1234FF78), 2),
+        'code_2_volt_batch': (lambda: ads8568.code_2_volt_batch(codes), 2 * MIXADS8568SGBenchDef.BATCH_SIZE),
+        'acquire_8ch': (lambda: ads8568.acquire(buffer, MIXADS8568SGBenchDef.STREAM_BLOCK),
+                        8 * MIXADS8568SGBenchDef.STREAM_BLOCK),
+    }
+    for count, channels in MIXADS8568SGBenchDef.SCAN_CHANNELS.items():
+        cases['scan_ch_%dch' % count] = ((lambda channels=channels: ads8568.scan_ch(channels)), count)
+        cases['stream_%dch' % count] = (
+            (lambda channels=channels: list(ads8568.stream(channels, MIXADS8568SGBenchDef.STREAM_BLOCK,
+                                                           MIXADS8568SGBenchDef.STREAM_BLOCK))),
+            count * MIXADS8568SGBenchDef.STREAM_BLOCK)
+    return cases
+
+
+def run_case(sim, ads8568, func, samples_per_call, duration):
+    '''
+    Run one case for duration, at least one call.
+
+    Returns:
+        dict, metrics of the case.
+
+    '''
+    pins = sim.pins.values()
+    bus_start = sim.bus.read_count + sim.bus.write_count
+    gpio_start = sum(pin.set_count + pin.get_count for pin in pins)
+    calls = 0
+    with TimeSplit(ads8568) as split:
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= duration:
+                break
+    samples = calls * samples_per_call
+    bus = sim.bus.read_count + sim.bus.write_count - bus_start
+    gpio = sum(pin.set_count + pin.get_count for pin in pins) - gpio_start
+    return {
+        'calls': calls,
+        'samples': samples,
+        'samples_per_s': samples / elapsed,
+        'us_per_sample': elapsed / samples * 1000000,
+        'bus_per_sample': float(bus) / samples,
+        'gpio_per_sample': float(gpio) / samples,
+        'sleep_ratio': split.sleep / elapsed,
+        'spin_ratio': split.spin / elapsed,
+        'python_ratio': max(0.0, 1 - (split.sleep + split.spin) / elapsed),
+    }
+
+
+def run_benchmarks(timing='datasheet', duration=MIXADS8568SGBenchDef.DURATION, names=None):
+    '''
+    Run benchmark cases.
+
+    Args:
+        timing:      string, ['conservative', 'datasheet'], timing profile of the driver.
+        duration:    float, unit s, run time of every case.
+        names:       list/None, case names to run, None means all.
+
+    Returns:
+        dict, {'meta': {...}, 'results': {case name: metrics}}.
+
+    Examples:
+        report = run_benchmarks('datasheet', 0.5)
+
+    '''
+    sim, ads8568 = create_bench_driver(timing)
+    cases = bench_cases(sim, ads8568)
+    results = {}
+    for name in sorted(cases):
+        if names is None or name in names:
+            func, samples_per_call = cases[name]
+            results[name] = run_case(sim, ads8568, func, samples_per_call, duration)
+    meta = {
+        'timing': timing,
+        'duration': duration,
+        'python': platform.python_version(),
+        'numpy': mix_ads8568_sg.np is not None,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(baseline, report, threshold=MIXADS8568SGBenchDef.THRESHOLD):
+    '''
+    Compare a report with a baseline report.
+
+    Args:
+        baseline:     dict, baseline report.
+        report:       dict, new report.
+        threshold:    float, allowed slowdown of us_per_sample, 0.2 means 20%.
+
+    Returns:
+        list, (case name, baseline us_per_sample, new us_per_sample) of every regression.
+
+    '''
+    regressions = []
+    for name, metrics in sorted(report['results'].items()):
+        if name not in baseline['results']:
+            continue
+        old = baseline['results'][name][MIXADS8568SGBenchDef.METRIC]
+        new = metrics[MIXADS8568SGBenchDef.METRIC]
+        if new > old * (1 + threshold):
+            regressions.append((name, old, new))
+    return regressions
+
+
+def format_report(report):
+    lines = ['%-20s %12s %12s %8s %8s %7s %7s %7s' % ('case', 'samples/s', 'us/sample', 'bus/smp', 'gpio/smp',
+                                                      'sleep', 'spin', 'python')]
+    for name, m in sorted(report['results'].items()):
+        lines.append('%-20s %12.0f %12.3f %8.3f %8.3f %6.1f%% %6.1f%% %6.1f%%' % (
+            name, m['samples_per_s'], m['us_per_sample'], m['bus_per_sample'], m['gpio_per_sample'],
+            m['sleep_ratio'] * 100, m['spin_ratio'] * 100, m['python_ratio'] * 100))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MIXADS8568SG acquisition benchmark')
+    parser.add_argument('--timing', default='datasheet', choices=sorted(MIXADS8568SGDef.TIMING_PROFILE))
+    parser.add_argument('--duration', type=float, default=MIXADS8568SGBenchDef.DURATION)
+    parser.add_argument('--case', action='append', dest='names', help='case to run, may repeat')
+    parser.add_argument('--output', help='save report to this json file')
+    parser.add_argument('--baseline', help='baseline json report to compare with')
+    parser.add_argument('--threshold', type=float, default=MIXADS8568SGBenchDef.THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.timing, args.duration, args.names)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for name, old, new in regressions:
+            print('REGRESSION %s: %.3f -> %.3f us/sample' % (name, old, new))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
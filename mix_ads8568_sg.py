@@ -1,7 +1,19 @@
 # -*- coding: utf-8 -*-
+import math
 import time
+import queue
+import asyncio
+import threading
+from array import array
+from collections import OrderedDict
+from collections import namedtuple
 from mix.driver.core.bus.axi4_lite_bus import AXI4LiteBus
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 __author__ = 'jionghao.huang@SmartGiant'
 __version__ = '0.1'
 
@@ -21,11 +33,17 @@ class MIXADS8568SGDef:
 
     STATUS = {'enable': 0x01, 'disable': 0x00}
     CHANNEL_PAIR = {'A': CHANNEL_A_DATA, 'B': CHANNEL_B_DATA, 'C': CHANNEL_C_DATA, 'D': CHANNEL_D_DATA}
+    CHANNEL_PAIR_LIST = ['A', 'B', 'C', 'D']
+    CHANNEL_DATA_WIDTH = 4  # byte
 
     # Config register mask.
     INTERNAL_VREF_EN = 0x00001000
     INTERNAL_VREF_DIS = 0x00000000
     WR_RD_CONFIG_REG = 0xC0000000
+    CONFIG_DEFAULT = 0x000003FF
+    CONFIG_MASK = 0xFFFFFFFF
+    # Bit 9~0, internal reference DAC.
+    VREF_DAC_MASK = 0x000003FF
     # Hardware mode related register.
     # Bit 30
     READ_EN_NORMAL = 0x00000000
@@ -53,9 +71,13 @@ class MIXADS8568SGDef:
     VREF_3000_MV = 0x00002000
 
     POSITIVE_FULL_SCALE = 0x7FFF
+    SIGN_BIT = 0x8000
+    CODE_MODULUS = 0x10000
 
     DEV_FUNC_MODE = {'sw': 0, 'hw': 1}
     CHANNEL = {1: 'A', 2: 'A', 3: 'B', 4: 'B', 5: 'C', 6: 'C', 7: 'D', 8: 'D'}
+    # Odd channel of every pair, the even one is the next.
+    PAIR_CHANNEL = {'A': 1, 'B': 3, 'C': 5, 'D': 7}
     HW_ABSOLUTE_VOLT_RANGE = {'4VREF': 0, '2VREF': 1}
     SW_ABSOLUTE_VOLT_RANGE = {
         'A': {'4VREF': 0, '2VREF': 0x01000000},
@@ -64,20 +86,904 @@ class MIXADS8568SGDef:
         'D': {'4VREF': 0, '2VREF': 0x00080000}
     }
     MAX_VREF_OUTPUT_RANGE = {2.5: VREF_2500_MV, 3: VREF_3000_MV}
+    BUSY_INT_MODE = {'busy': BUSY_MODE, 'interrupt': INTERRUPT_MODE}
+    BUSY_INT_POLARITY = {'high': ACTIVE_HIGH, 'low': ACTIVE_LOW}
 
     CH_MIN = 1
     CH_MAX = 8
 
+    PIN_NAMES = ['convst_a', 'convst_b', 'convst_c', 'convst_d', 'busy', 'xclk', 'hw_sw_sel', 'ref_sel',
+                 'stby', 'reset', 'cs', 'refbuf_en', 'asleep_sel', 'ser_sel', 'sel_cd', 'sel_b']
+    BUS_API = ['read_8bit_inc', 'write_8bit_inc', 'read_32bit_inc', 'write_32bit_inc']
+
+    STREAM_BLOCK_SIZE = 64
+    QUEUE_SIZE = 16
+    BACKPRESSURE_POLICY = ['block', 'drop_oldest', 'drop_newest']
+    # Poll interval of a blocked producer for stop request, unit s.
+    STOP_POLL_INTERVAL = 0.05
+
+    # Conversion wait, unit s.
+    WAIT_SPIN_TIME = 0.00005
+    WAIT_MIN_BACKOFF = 0.00001
+    WAIT_MAX_BACKOFF = 0.001
+    WAIT_TIMEOUT = 1
+
+    # Timing profile, unit ns.
+    # reset_low: reset low time before the pulse; reset_pulse: reset pulse width, at least 50ns;
+    # convst_low/convst_high: CONVST low/high time, at least 20ns each;
+    # conv_wait: wait after CONVST before polling BUSY, CONVST high to BUSY high is at most 25ns.
+    TIMING_PROFILE = {
+        'conservative': {'reset_low': 1000000, 'reset_pulse': 1000000, 'convst_low': 1000000,
+                         'convst_high': 1000000, 'conv_wait': 1000000},
+        'datasheet': {'reset_low': 100, 'reset_pulse': 100, 'convst_low': 50,
+                      'convst_high': 50, 'conv_wait': 50}
+    }
+    # Delay not shorter than this is done by time.sleep, shorter one by polling perf_counter_ns.
+    SLEEP_THRESHOLD_NS = 1000000
+
+    # Maximum conversion time of the chip, unit ns.
+    CONV_TIME_NS = 1330
+    # Bits read over SPI for every enabled channel pair.
+    PAIR_DATA_BITS = 32
+    OVERRUN_POLICY = ['skip', 'catch_up']
+    SCAN_PLAN_CACHE_SIZE = 64
+    JITTER_PERCENTILES = [50, 90, 99]
+
+    # Code to volt tables kept for different range and calibration configurations, 512KB each.
+    VOLT_TABLE_CACHE_SIZE = 16
+
+    CALIBRATION_MAGIC = b'ADS8568K'
+
+
+def precise_delay(delay_ns):
+    '''
+    Delay for delay_ns. Sub-millisecond delays spin on time.perf_counter_ns, because time.sleep can not
+    sleep that short; longer ones use time.sleep, which never returns early.
+
+    Args:
+        delay_ns:    int, unit ns, delay time.
+
+    Examples:
+        precise_delay(50)
+
+    '''
+    if delay_ns <= 0:
+        return
+    if delay_ns >= MIXADS8568SGDef.SLEEP_THRESHOLD_NS:
+        time.sleep(delay_ns / 1000000000.0)
+        return
+    deadline = time.perf_counter_ns() + delay_ns
+    while time.perf_counter_ns() < deadline:
+        pass
+
+
+class MIXADS8568SGTiming(object):
+    '''
+    MIXADS8568SGTiming is the timing profile of reset and conversion pulses.
+
+    Args:
+        profile:        string, ['conservative', 'datasheet'], base profile, 'conservative' keeps 1ms for
+                        every step, 'datasheet' uses the datasheet minimum with some margin.
+        reset_low:      int/None, unit ns, reset low time before the pulse, None means the profile value.
+        reset_pulse:    int/None, unit ns, reset pulse width, None means the profile value.
+        convst_low:     int/None, unit ns, CONVST low time, None means the profile value.
+        convst_high:    int/None, unit ns, CONVST high time, None means the profile value.
+        conv_wait:      int/None, unit ns, wait after CONVST before polling BUSY, None means the profile value.
+
+    Examples:
+        timing = MIXADS8568SGTiming('datasheet', conv_wait=200)
+        ads8568 = MIXADS8568SG(axi4_bus, ..., timing=timing)
+
+    '''
+
+    def __init__(self, profile='conservative', reset_low=None, reset_pulse=None, convst_low=None,
+                 convst_high=None, conv_wait=None):
+        assert profile in MIXADS8568SGDef.TIMING_PROFILE
+
+        timing = MIXADS8568SGDef.TIMING_PROFILE[profile]
+        self.profile = profile
+        self.reset_low = timing['reset_low'] if reset_low is None else reset_low
+        self.reset_pulse = timing['reset_pulse'] if reset_pulse is None else reset_pulse
+        self.convst_low = timing['convst_low'] if convst_low is None else convst_low
+        self.convst_high = timing['convst_high'] if convst_high is None else convst_high
+        self.conv_wait = timing['conv_wait'] if conv_wait is None else conv_wait
+        assert self.reset_pulse >= 50
+        assert min(self.reset_low, self.convst_low, self.convst_high, self.conv_wait) >= 0
+
+
+class MIXADS8568SGException(Exception):
+    '''
+    MIXADS8568SGException shows the exception of MIXADS8568SG.
+
+    '''
+
+    def __init__(self, err_str):
+        self._err_reason = '[MIXADS8568SG]: %s.' % (err_str)
+
+    def __str__(self):
+        return self._err_reason
+
+
+class MIXADS8568SGTimeoutException(MIXADS8568SGException):
+    '''
+    MIXADS8568SGTimeoutException shows the conversion was not done before the deadline.
+
+    '''
+    pass
+
+
+class MIXADS8568SGBusyWait(object):
+    '''
+    MIXADS8568SGBusyWait waits for conversion done by polling BUSY/INT pin.
+
+    It spins for spin_time first, which covers a normal conversion, then sleeps between polls with a
+    backoff doubled from min_backoff up to max_backoff, and raises MIXADS8568SGTimeoutException
+    when the conversion is not done within timeout.
+
+    Args:
+        spin_time:      float, unit s, time of polling without sleep.
+        min_backoff:    float, unit s, first sleep time after spin_time.
+        max_backoff:    float, unit s, maximum sleep time between polls.
+        timeout:        float, unit s, hard deadline of one wait.
+
+    Examples:
+        ads8568 = MIXADS8568SG(axi4_bus, ..., wait_strategy=MIXADS8568SGBusyWait(timeout=0.1))
+
+    '''
+
+    def __init__(self, spin_time=MIXADS8568SGDef.WAIT_SPIN_TIME, min_backoff=MIXADS8568SGDef.WAIT_MIN_BACKOFF,
+                 max_backoff=MIXADS8568SGDef.WAIT_MAX_BACKOFF, timeout=MIXADS8568SGDef.WAIT_TIMEOUT):
+        assert 0 <= spin_time <= timeout
+        assert 0 < min_backoff <= max_backoff
+
+        self.spin_time = spin_time
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+    def wait(self, pin, done_level):
+        '''
+        Wait until pin level is done_level.
+
+        Args:
+            pin:           instance(GPIO), BUSY/INT pin.
+            done_level:    int, [0, 1], pin level when conversion is done.
+
+        Returns:
+            int, number of polls.
+
+        Raises:
+            MIXADS8568SGTimeoutException: conversion is not done before timeout.
+
+        '''
+        polls = 1
+        if pin.get_level() == done_level:
+            return polls
+
+        start = time.perf_counter()
+        spin_end = start + self.spin_time
+        deadline = start + self.timeout
+        backoff = self.min_backoff
+        while True:
+            polls += 1
+            if pin.get_level() == done_level:
+                return polls
+            now = time.perf_counter()
+            if now >= deadline:
+                raise MIXADS8568SGTimeoutException('conversion not done in %s s' % (self.timeout))
+            if now >= spin_end:
+                time.sleep(min(backoff, deadline - now))
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def async_wait(self, get_level, done_level):
+        '''
+        Wait until pin level is done_level, the event loop runs between polls.
+
+        Args:
+            get_level:     coroutine function, returns the BUSY/INT pin level.
+            done_level:    int, [0, 1], pin level when conversion is done.
+
+        Returns:
+            int, number of polls.
+
+        Raises:
+            MIXADS8568SGTimeoutException: conversion is not done before timeout.
+
+        '''
+        polls = 1
+        if await get_level() == done_level:
+            return polls
+
+        start = time.perf_counter()
+        spin_end = start + self.spin_time
+        deadline = start + self.timeout
+        backoff = self.min_backoff
+        while True:
+            polls += 1
+            if await get_level() == done_level:
+                return polls
+            now = time.perf_counter()
+            if now >= deadline:
+                raise MIXADS8568SGTimeoutException('conversion not done in %s s' % (self.timeout))
+            if now >= spin_end:
+                await asyncio.sleep(min(backoff, deadline - now))
+                backoff = min(backoff * 2, self.max_backoff)
+
+
+class MIXADS8568SGInterruptWait(object):
+    '''
+    MIXADS8568SGInterruptWait waits for conversion done signalled by the INT pin in interrupt mode.
+
+    The edge handler of the INT pin calls notify(), the waiting thread sleeps on an event instead of
+    polling. The pin is still checked every poll_interval, so a missed notify only costs latency.
+    A notify before wait() starts is discarded, so a late one of the previous conversion does not
+    end the next wait early. async_wait() is the same for coroutines, notify() wakes them through
+    their event loop.
+
+    Args:
+        timeout:          float, unit s, hard deadline of one wait.
+        poll_interval:    float, unit s, time between pin checks when no notify comes.
+
+    Examples:
+        wait_strategy = MIXADS8568SGInterruptWait()
+        ads8568.set_busy_mode('interrupt', 'high', wait_strategy)
+
+        # In the INT pin edge handler of the application:
+        def int_isr():
+            wait_strategy.notify()
+
+    '''
+
+    def __init__(self, timeout=MIXADS8568SGDef.WAIT_TIMEOUT, poll_interval=MIXADS8568SGDef.WAIT_MAX_BACKOFF):
+        assert 0 < poll_interval <= timeout
+
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        # (loop, asyncio.Event) of every running async_wait.
+        self._async_waiters = []
+
+    def notify(self, *args):
+        '''
+        Signal conversion done, called from the INT pin edge handler.
+
+        '''
+        self._event.set()
+        for loop, event in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The loop is closed, its wait has ended.
+                pass
+
+    def wait(self, pin, done_level):
+        '''
+        Wait until conversion done is signalled or pin level is done_level.
+
+        Args:
+            pin:           instance(GPIO), BUSY/INT pin.
+            done_level:    int, [0, 1], pin level when conversion is done.
+
+        Returns:
+            int, number of pin checks.
+
+        Raises:
+            MIXADS8568SGTimeoutException: conversion is not done before timeout.
+
+        '''
+        # Drop a stale notify, the pin check below still sees a conversion which is already done.
+        self._event.clear()
+        polls = 0
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            polls += 1
+            if pin.get_level() == done_level:
+                return polls
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise MIXADS8568SGTimeoutException('conversion not done in %s s' % (self.timeout))
+            if self._event.wait(min(self.poll_interval, remaining)):
+                self._event.clear()
+                return polls
+
+    async def async_wait(self, get_level, done_level):
+        '''
+        Wait until conversion done is signalled or pin level is done_level, the event loop runs
+        while waiting.
+
+        Args:
+            get_level:     coroutine function, returns the BUSY/INT pin level.
+            done_level:    int, [0, 1], pin level when conversion is done.
+
+        Returns:
+            int, number of pin checks.
+
+        Raises:
+            MIXADS8568SGTimeoutException: conversion is not done before timeout.
+
+        '''
+        # Every wait has its own event, so a stale notify can not end it.
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        self._async_waiters.append(waiter)
+        try:
+            polls = 0
+            deadline = time.perf_counter() + self.timeout
+            while True:
+                polls += 1
+                if await get_level() == done_level:
+                    return polls
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise MIXADS8568SGTimeoutException('conversion not done in %s s' % (self.timeout))
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(self.poll_interval, remaining))
+                    return polls
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._async_waiters.remove(waiter)
+
+
+class MIXADS8568SGConfig(object):
+    '''
+    MIXADS8568SGConfig is a transaction on the shadow copy of the CONFIG register.
+
+    Bit changes are gathered on the transaction and committed with one write_config_register
+    when the outermost transaction exits without exception.
+
+    Examples:
+        with ads8568.config() as cfg:
+            cfg.set_bits(MIXADS8568SGDef.INTERNAL_VREF_EN)
+            cfg.update(MIXADS8568SGDef.VREF_DAC_MASK, 0x1FF)
+
+    '''
+
+    def __init__(self, ads8568):
+        self._ads8568 = ads8568
+        self._depth = 0
+        self.value = ads8568.current_config_data
+
+    def __enter__(self):
+        if 0 == self._depth:
+            self.value = self._ads8568.current_config_data
+            self._ads8568._config_txn = self
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if 0 == self._depth:
+            self._ads8568._config_txn = None
+            if exc_type is None:
+                self._ads8568._commit_config(self.value)
+        return False
+
+    def update(self, mask, bits):
+        '''
+        Replace the bits selected by mask.
+
+        Args:
+            mask:    int, [0x0 ~ 0xFFFFFFFF], bits to change.
+            bits:    int, [0x0 ~ 0xFFFFFFFF], new value of the bits selected by mask.
+
+        '''
+        assert 0 <= mask <= MIXADS8568SGDef.CONFIG_MASK
+        self.value = (self.value & ~mask & MIXADS8568SGDef.CONFIG_MASK) | (bits & mask)
+
+    def set_bits(self, mask):
+        '''
+        Set the bits selected by mask.
+
+        Args:
+            mask:    int, [0x0 ~ 0xFFFFFFFF], bits to set.
+
+        '''
+        self.update(mask, mask)
+
+    def clear_bits(self, mask):
+        '''
+        Clear the bits selected by mask.
+
+        Args:
+            mask:    int, [0x0 ~ 0xFFFFFFFF], bits to clear.
+
+        '''
+        self.update(mask, 0)
+
+
+class MIXADS8568SGSampleBuffer(object):
+    '''
+    MIXADS8568SGSampleBuffer is a fixed-capacity ring buffer of timestamped samples.
+
+    Raw 16bit codes of every channel and perf_counter_ns timestamps are kept in preallocated typed
+    arrays, so memory is constant and appending allocates nothing. When full, the oldest samples are
+    overwritten. Codes are converted to volt only when read.
+
+    Args:
+        channels:    list, [1~8], list of channel of every sample.
+        capacity:    int, [1~], maximum number of samples kept.
+
+    Examples:
+        buffer = MIXADS8568SGSampleBuffer([1, 2], 10000)
+        ads8568.acquire(buffer, 100)
+        timestamps, volts = buffer.read(ads8568.pair_volt_range, calibration=ads8568.calibration)
+
+    '''
+
+    def __init__(self, channels, capacity):
+        assert isinstance(channels, list) and len(channels) > 0
+        for ch in channels:
+            assert ch in MIXADS8568SGDef.CHANNEL
+        assert capacity >= 1
+
+        self.channels = list(channels)
+        self.capacity = capacity
+        self._width = len(channels)
+        # Codes are interleaved, sample i of channel index j is at i * width + j.
+        self._codes = array('H', [0]) * (capacity * self._width)
+        self._timestamps = array('q', [0]) * capacity
+        self._index = 0
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def clear(self):
+        '''
+        Drop all samples, the storage is kept.
+
+        '''
+        self._index = 0
+        self.total = 0
+
+    def append(self, timestamp, codes):
+        '''
+        Append one sample.
+
+        Args:
+            timestamp:    int, unit ns, perf_counter_ns time of the sample.
+            codes:        list, [0x0 ~ 0xFFFF], raw code of every channel, in the order of channels.
+
+        '''
+        offset = self._index * self._width
+        for j in range(self._width):
+            self._codes[offset + j] = codes[j]
+        self._advance(timestamp)
+
+    def append_pair_data(self, timestamp, pair_data, slots):
+        '''
+        Append one sample from channel pair data, as read by read_ch_pair_data.
+
+        Args:
+            timestamp:    int, unit ns, perf_counter_ns time of the sample.
+            pair_data:    list, [0x0 ~ 0xFFFFFFFF], data of channel pairs.
+            slots:        list, (index in pair_data, shift of half-word) of every channel.
+
+        '''
+        offset = self._index * self._width
+        for index, shift in slots:
+            self._codes[offset] = (pair_data[index] >> shift) & 0x0000FFFF
+            offset += 1
+        self._advance(timestamp)
+
+    def _advance(self, timestamp):
+        self._timestamps[self._index] = timestamp
+        self._index += 1
+        if self._index == self.capacity:
+            self._index = 0
+        self.total += 1
+
+    def _order(self, n):
+        # Start position and number of the newest n samples, oldest first.
+        size = len(self)
+        n = size if n is None else min(n, size)
+        return (self._index - n) % self.capacity, n
+
+    def read_codes(self, n=None):
+        '''
+        Read the newest samples as signed codes, oldest first.
+
+        Args:
+            n:    int/None, number of samples, None means all kept samples.
+
+        Returns:
+            (timestamps, codes), tuple, timestamps is array('q') or numpy.ndarray, codes is a list of
+                                 signed code array per channel, numpy.ndarray when NumPy is installed.
+
+        '''
+        start, n = self._order(n)
+        if np is not None:
+            all_codes = np.frombuffer(self._codes, dtype=np.int16).reshape(self.capacity, self._width)
+            all_timestamps = np.frombuffer(self._timestamps, dtype=np.int64)
+            rows = (np.arange(n) + start) % self.capacity
+            codes = all_codes[rows]
+            return all_timestamps[rows], [codes[:, j] for j in range(self._width)]
+
+        signed = array('h', self._codes.tobytes())
+        timestamps = array('q')
+        codes = [array('h') for j in range(self._width)]
+        for i in range(n):
+            row = (start + i) % self.capacity
+            timestamps.append(self._timestamps[row])
+            for j in range(self._width):
+                codes[j].append(signed[row * self._width + j])
+        return timestamps, codes
+
+    def read(self, volt_range, n=None, calibration=None):
+        '''
+        Read the newest samples as volt values, oldest first.
+
+        Args:
+            volt_range:     float/dict, unit V, input volt range of the codes, e.g. ads8568.input_volt_range,
+                            or range of every channel pair, e.g. ads8568.pair_volt_range.
+            n:              int/None, number of samples, None means all kept samples.
+            calibration:    instance(MIXADS8568SGCalibration)/None, gain and offset applied to the volt
+                            values, e.g. ads8568.calibration. None means no calibration.
+
+        Returns:
+            (timestamps, volts), tuple, volts is a list of volt array per channel, numpy.ndarray
+                                 when NumPy is installed, else array('d').
+
+        '''
+        timestamps, codes = self.read_codes(n)
+        if isinstance(volt_range, dict):
+            lsbs = [volt_range[MIXADS8568SGDef.CHANNEL[ch]] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+                    for ch in self.channels]
+        else:
+            lsbs = [volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE] * len(self.channels)
+        # Calibration is linear, volt = code * lsb * gain + offset.
+        coefficients = [calibration.get(ch) if calibration else (1.0, 0.0) for ch in self.channels]
+        scales = [(lsb * gain, offset) for lsb, (gain, offset) in zip(lsbs, coefficients)]
+        if np is not None:
+            return timestamps, [code * scale + offset for code, (scale, offset) in zip(codes, scales)]
+        return timestamps, [array('d', [code * scale + offset for code in ch_codes])
+                            for ch_codes, (scale, offset) in zip(codes, scales)]
+
+
+class MIXADS8568SGVoltTable(object):
+    '''
+    MIXADS8568SGVoltTable caches 65536-entry code to volt tables, indexed by the unsigned 16bit code.
+
+    Tables only depend on the input volt range and the calibration of the channel, so they are shared
+    by all drivers and channels; the least recently used one is evicted when more than max_size
+    configurations are in use.
+
+    Args:
+        max_size:    int, [1~], number of tables kept.
+
+    Examples:
+        table, np_table = MIXADS8568SGVoltTable().get(10.0)
+        volt = table[0x7FFF]
+
+    '''
+
+    def __init__(self, max_size=MIXADS8568SGDef.VOLT_TABLE_CACHE_SIZE):
+        assert max_size >= 1
+
+        self.max_size = max_size
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def get(self, volt_range, gain=1.0, offset=0.0):
+        '''
+        Get the table of volt_range and calibration, build it on first use.
+
+        Args:
+            volt_range:    float, unit V, input volt range.
+            gain:          float, calibration gain, volt = raw volt * gain + offset.
+            offset:        float, unit V, calibration offset.
+
+        Returns:
+            (table, np_table), tuple, table is array('d'), np_table is a zero-copy numpy.ndarray view
+                               of it, or None when NumPy is not installed.
+
+        '''
+        key = (volt_range, gain, offset)
+        with self._lock:
+            tables = self._tables.get(key)
+            if tables is not None:
+                self._tables.move_to_end(key)
+                return tables
+
+            lsb = volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+            # Codes 0x8000 ~ 0xFFFF are negative in two's complement.
+            table = array('d', [code * lsb for code in range(MIXADS8568SGDef.SIGN_BIT)])
+            table.extend([(code - MIXADS8568SGDef.CODE_MODULUS) * lsb
+                          for code in range(MIXADS8568SGDef.SIGN_BIT, MIXADS8568SGDef.CODE_MODULUS)])
+            if gain != 1.0 or offset != 0.0:
+                table = array('d', [volt * gain + offset for volt in table])
+            tables = (table, np.frombuffer(table, dtype=np.float64) if np is not None else None)
+            self._tables[key] = tables
+            if len(self._tables) > self.max_size:
+                self._tables.popitem(last=False)
+            return tables
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+
+# Shared by all MIXADS8568SG instances.
+volt_table_cache = MIXADS8568SGVoltTable()
+
+
+class MIXADS8568SGCalibration(object):
+    '''
+    MIXADS8568SGCalibration is the gain and offset of every channel, volt = raw volt * gain + offset.
+
+    The coefficients are kept in one array('d') of gain, offset pairs, channel 1 first, so a table
+    is saved and loaded as a single block. A driver folds them into its code to volt tables, blocks
+    converted elsewhere are corrected by apply().
+
+    Args:
+        coefficients:    list/None, [gain1, offset1, ..., gain8, offset8], None means gain 1 and offset 0.
+
+    Examples:
+        calibration = MIXADS8568SGCalibration()
+        calibration.set(3, 1.002, -0.0015)
+        calibration.save('/tmp/ads8568.cal')
+        ads8568.set_calibration(MIXADS8568SGCalibration.load('/tmp/ads8568.cal'))
+
+    '''
+
+    def __init__(self, coefficients=None):
+        if coefficients is None:
+            coefficients = [1.0, 0.0] * MIXADS8568SGDef.CH_MAX
+        assert len(coefficients) == 2 * MIXADS8568SGDef.CH_MAX
+
+        self.coefficients = array('d', coefficients)
+
+    def __eq__(self, other):
+        return isinstance(other, MIXADS8568SGCalibration) and self.coefficients == other.coefficients
+
+    def __ne__(self, other):
+        return not self == other
+
+    def set(self, ch, gain, offset):
+        '''
+        Set the calibration of one channel.
+
+        Args:
+            ch:        int, [1~8], channel.
+            gain:      float, gain.
+            offset:    float, unit V, offset.
+
+        '''
+        assert ch in MIXADS8568SGDef.CHANNEL
+
+        self.coefficients[2 * (ch - 1)] = gain
+        self.coefficients[2 * (ch - 1) + 1] = offset
+
+    def get(self, ch):
+        '''
+        Get the calibration of one channel.
+
+        Args:
+            ch:    int, [1~8], channel.
+
+        Returns:
+            (gain, offset), tuple.
+
+        '''
+        assert ch in MIXADS8568SGDef.CHANNEL
+
+        return self.coefficients[2 * (ch - 1)], self.coefficients[2 * (ch - 1) + 1]
+
+    def apply(self, channels, volts):
+        '''
+        Correct a block of raw volt values in one step.
+
+        Args:
+            channels:    list, [1~8], channel of every column.
+            volts:       list/numpy.ndarray, block of samples, one row per sample in the order of channels.
+
+        Returns:
+            numpy.ndarray of float64 when NumPy is installed, else list of list.
+
+        '''
+        for ch in channels:
+            assert ch in MIXADS8568SGDef.CHANNEL
+
+        if np is not None:
+            coefficients = np.frombuffer(self.coefficients, dtype=np.float64).reshape(-1, 2)
+            index = np.asarray(channels) - 1
+            return np.asarray(volts, dtype=np.float64) * coefficients[index, 0] + coefficients[index, 1]
+
+        coefficients = [self.get(ch) for ch in channels]
+        return [[volt * gain + offset for volt, (gain, offset) in zip(row, coefficients)] for row in volts]
+
+    def save(self, path):
+        '''
+        Save the coefficients to a binary file.
+
+        Args:
+            path:    string, file path.
+
+        '''
+        with open(path, 'wb') as f:
+            f.write(MIXADS8568SGDef.CALIBRATION_MAGIC)
+            self.coefficients.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Load coefficients saved by save().
+
+        Args:
+            path:    string, file path.
+
+        Returns:
+            instance(MIXADS8568SGCalibration).
+
+        '''
+        calibration = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(MIXADS8568SGDef.CALIBRATION_MAGIC)) != MIXADS8568SGDef.CALIBRATION_MAGIC:
+                raise MIXADS8568SGException('%s is not a calibration file' % path)
+            coefficients = array('d')
+            try:
+                coefficients.fromfile(f, len(calibration.coefficients))
+            except EOFError:
+                raise MIXADS8568SGException('%s is truncated' % path)
+        calibration.coefficients = coefficients
+        return calibration
+
+
+class MIXADS8568SGScanPlan(namedtuple('MIXADS8568SGScanPlan', ['channels', 'ch_pairs', 'addr', 'rd_len', 'slots'])):
+    '''
+    MIXADS8568SGScanPlan is a channel list compiled for MIXADS8568SG.scan_ch.
+
+    channels is the tuple of channel, ch_pairs the tuple of channel pair to convert, addr and rd_len
+    the burst read of the channel data registers, and slots the (word index in the burst, shift of
+    half-word) of every channel in output order.
+
+    '''
+    __slots__ = ()
+
+
+class MIXADS8568SGStats(object):
+    '''
+    MIXADS8568SGStats collects counters and log2 latency histograms of MIXADS8568SG.
+
+    Every event is also passed to the sinks as sink(kind, name, value), kind is 'count' or 'latency',
+    value of latency is in ns.
+
+    Examples:
+        stats = MIXADS8568SGStats()
+        stats.add_sink(lambda kind, name, value: print(kind, name, value))
+
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sinks = []
+        self.reset()
+
+    def reset(self):
+        '''
+        Clear all counters and histograms.
+
+        '''
+        with self._lock:
+            self._counters = {}
+            # name: [count, total, min, max, {bucket: count}]
+            self._histograms = {}
+
+    def add_sink(self, sink):
+        '''
+        Add a sink called with (kind, name, value) on every event.
+
+        '''
+        self.sinks.append(sink)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+        for sink in self.sinks:
+            sink('count', name, n)
+
+    def observe(self, name, latency_ns):
+        # Bucket i holds latency in [2^(i-1), 2^i) ns.
+        bucket = int(latency_ns).bit_length()
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = [0, 0, latency_ns, latency_ns, {}]
+            hist[0] += 1
+            hist[1] += latency_ns
+            hist[2] = min(hist[2], latency_ns)
+            hist[3] = max(hist[3], latency_ns)
+            hist[4][bucket] = hist[4].get(bucket, 0) + 1
+        for sink in self.sinks:
+            sink('latency', name, latency_ns)
+
+    def snapshot(self, reset=False):
+        '''
+        Get a copy of the counters and histograms.
+
+        Args:
+            reset:    bool, clear the statistics after the copy.
+
+        Returns:
+            dict, {'counters': {name: count}, 'histograms': {name: {'count', 'total_ns', 'min_ns',
+                  'max_ns', 'mean_ns', 'buckets': {upper bound ns: count}}}}.
+
+        '''
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {}
+            for name, (count, total, low, high, buckets) in self._histograms.items():
+                histograms[name] = {'count': count, 'total_ns': total, 'min_ns': low, 'max_ns': high,
+                                    'mean_ns': float(total) / count,
+                                    'buckets': dict((1 << bucket, n) for bucket, n in sorted(buckets.items()))}
+            if reset:
+                self._counters = {}
+                self._histograms = {}
+        return {'counters': counters, 'histograms': histograms}
+
+
+class _MIXADS8568SGStatsBus(object):
+    # Counts bus calls per api and register and times them, other attributes go to the bus.
+
+    def __init__(self, axi4_bus, stats):
+        self.axi4_bus = axi4_bus
+        self._stats = stats
+        for api in MIXADS8568SGDef.BUS_API:
+            setattr(self, api, self._wrap(api))
+
+    def __getattr__(self, name):
+        return getattr(self.axi4_bus, name)
+
+    def _wrap(self, api):
+        stats = self._stats
+
+        def call(addr, *args):
+            start = time.perf_counter_ns()
+            try:
+                return getattr(self.axi4_bus, api)(addr, *args)
+            finally:
+                stats.observe('bus.' + api, time.perf_counter_ns() - start)
+                stats.count('bus.%s.0x%02X' % (api, addr))
+        return call
+
+
+class _MIXADS8568SGStatsPin(object):
+    # Counts level writes and reads of a pin, other attributes go to the pin.
+
+    def __init__(self, pin, name, stats):
+        self.pin = pin
+        self._set_name = 'gpio.%s.set_level' % (name)
+        self._get_name = 'gpio.%s.get_level' % (name)
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.pin, name)
+
+    def set_level(self, level):
+        self._stats.count(self._set_name)
+        return self.pin.set_level(level)
+
+    def get_level(self):
+        self._stats.count(self._get_name)
+        return self.pin.get_level()
+
 
 class MIXADS8568SG(object):
     '''
     MIXADS8568SG is the ipcore of chip ads8568.
 
+    axi4_bus is the register backend, an AXI4LiteBus or any object with read_8bit_inc, write_8bit_inc,
+    read_32bit_inc and write_32bit_inc, e.g. MIXADS8568SGMmapBus or MIXADS8568SGPostedWriteBus.
+
     '''
 
     def __init__(self, axi4_bus, convst_a=None, convst_b=None, convst_c=None, convst_d=None,
                  busy=None, xclk=None, hw_sw_sel=None, ref_sel=None, stby=None, reset=None,
-                 cs=None, refbuf_en=None, asleep_sel=None, ser_sel=None, sel_cd=None, sel_b=None):
+                 cs=None, refbuf_en=None, asleep_sel=None, ser_sel=None, sel_cd=None, sel_b=None,
+                 wait_strategy=None, timing=None):
         self.axi4_bus = axi4_bus
         self.convst_a = convst_a
         self.convst_b = convst_b
@@ -99,7 +1005,59 @@ class MIXADS8568SG(object):
         self.dev_func_mode = 'hw'
         self.max_vref_range = 2.5
         self.input_volt_range = 4 * self.max_vref_range
-        self.current_config_data = 0x000003FF
+        # In sw mode every channel pair has its own range, input_volt_range is the one set last.
+        self.pair_vrange = dict((ch_pair, '4VREF') for ch_pair in MIXADS8568SGDef.CHANNEL_PAIR_LIST)
+        self.pair_volt_range = dict((ch_pair, self.input_volt_range) for ch_pair in MIXADS8568SGDef.CHANNEL_PAIR_LIST)
+        self._vrange = '4VREF'
+        self.calibration = MIXADS8568SGCalibration()
+        # Channel (None for input_volt_range) -> (key, table, np_table), dropped when range or calibration changes.
+        self._volt_tables = {}
+        # Shadow copy of CONFIG register, the hardware is only read back by verify_config.
+        self.current_config_data = MIXADS8568SGDef.CONFIG_DEFAULT
+        self._config_txn = None
+        # Serializes bus and pin access between acquisition threads and foreground calls.
+        self.bus_lock = threading.RLock()
+        self._async_lock = None
+        # Instrumentation is off by default, the hot path only checks it for None.
+        self._stats = None
+        # Last known level of driven pins and value of written IP registers, to skip redundant writes.
+        self._pin_level = {}
+        self._reg_value = {}
+
+        self.wait_strategy = wait_strategy or MIXADS8568SGBusyWait()
+        self.timing = timing or MIXADS8568SGTiming()
+        self.busy_mode = 'busy'
+        self.busy_polarity = 'high'
+        # SPI clock of the ipcore, unit Hz, None until set_spi_speed is called.
+        self.spi_speed = None
+        # Compiled scan_ch plans by tuple of channel, least recently used first.
+        self._scan_plans = OrderedDict()
+        # BUSY is active high by default, conversion is done when it is low.
+        self._conv_done_level = 0
+
+    def invalidate(self):
+        '''
+        MIXADS8568SG forget the tracked pin levels and IP register values, so the next writes go to
+        hardware. Call it after the pins or registers are changed outside this driver.
+
+        Examples:
+            mixads8568sg.invalidate()
+
+        '''
+        self._pin_level.clear()
+        self._reg_value.clear()
+
+    def _set_pin_level(self, pin, level):
+        with self.bus_lock:
+            if self._pin_level.get(pin) != level:
+                pin.set_level(level)
+                self._pin_level[pin] = level
+
+    def _write_8bit_reg(self, addr, value):
+        with self.bus_lock:
+            if self._reg_value.get(addr) != value:
+                self.axi4_bus.write_8bit_inc(addr, [value])
+                self._reg_value[addr] = value
 
     def ctrl_dev(self, status):
         '''
@@ -112,42 +1070,209 @@ class MIXADS8568SG(object):
             mixads8568sg.ctrl_dev('enable')
 
         '''
-        assert status in MIXADS8568SGDef.STATUS
+        assert status in MIXADS8568SGDef.STATUS
+
+        self._write_8bit_reg(MIXADS8568SGDef.MODULE_STATUS, MIXADS8568SGDef.STATUS[status])
+
+    def write_config_register(self, wr_data):
+        '''
+        MIXADS8568SG wirte config register.(0nly effective in sw mode.)
+
+        Args:
+            wr_data:  int, [0x0 ~ 0xFFFFFFFF], data to write.
+
+        Examples:
+            mixads8568sg.write_config_register(0xC00003FF)
+
+        '''
+        assert isinstance(wr_data, int)
+        assert 0x00000000 <= wr_data <= 0xFFFFFFFF
+
+        with self.bus_lock:
+            self.axi4_bus.write_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, [wr_data])
+
+    def read_config_register(self):
+        '''
+        MIXADS8568SG read config register.(0nly effective in sw mode.)
+
+        Examples:
+            mixads8568sg.read_config_register()
+
+        '''
+        with self.bus_lock:
+            # Need debug.
+            wr_data = MIXADS8568SGDef.WR_RD_CONFIG_REG | self.current_config_data
+            self.write_config_register(wr_data)
+            self.start_conv('A')
+            # time.sleep(0.001)
+            rd_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, MIXADS8568SGDef.DATA_LEN)
+
+            return rd_data[0]
+
+    def config(self):
+        '''
+        MIXADS8568SG start a transaction on the shadow CONFIG register. All changes made in the
+        transaction, including the ones of sel_max_vref_output_range, set_absolute_volt_range and
+        set_inter_vref, are committed with one write_config_register at the end.
+
+        Returns:
+            MIXADS8568SGConfig, transaction context manager.
+
+        Examples:
+            with mixads8568sg.config():
+                mixads8568sg.sel_max_vref_output_range(3)
+                mixads8568sg.set_absolute_volt_range('sw', '2VREF', 'B')
+                mixads8568sg.set_inter_vref('sw', 2.5)
+
+        '''
+        if self._config_txn is not None:
+            return self._config_txn
+        return MIXADS8568SGConfig(self)
+
+    def verify_config(self):
+        '''
+        MIXADS8568SG read back CONFIG register from hardware and compare it with the shadow copy.
+
+        Returns:
+            bool, True if hardware CONFIG register is the same as the shadow copy.
+
+        Examples:
+            mixads8568sg.verify_config()
+
+        '''
+        mask = ~MIXADS8568SGDef.WR_RD_CONFIG_REG & MIXADS8568SGDef.CONFIG_MASK
+        return (self.read_config_register() & mask) == (self.current_config_data & mask)
+
+    def _update_config(self, mask, bits):
+        with self.config() as cfg:
+            cfg.update(mask, bits)
+
+    def _commit_config(self, wr_data):
+        if wr_data != self.current_config_data:
+            # The shadow keeps the CONFIG bits only, the device takes the write with the WR_RD bits set.
+            self.write_config_register(MIXADS8568SGDef.WR_RD_CONFIG_REG | wr_data)
+            self.current_config_data = wr_data
+
+    def set_busy_mode(self, busy_mode='busy', polarity='high', wait_strategy=None):
+        '''
+        MIXADS8568SG select BUSY/INT pin mode and polarity, and the strategy to wait for conversion done.
+        (Mode bits are only effective in sw mode.)
+
+        Args:
+            busy_mode:        string, ['busy', 'interrupt'], BUSY/INT pin mode.
+            polarity:         string, ['high', 'low'], BUSY/INT pin active level.
+            wait_strategy:    instance/None, MIXADS8568SGBusyWait or MIXADS8568SGInterruptWait, None keeps
+                              the current one in busy mode and uses MIXADS8568SGInterruptWait in interrupt mode.
+
+        Examples:
+            mixads8568sg.set_busy_mode('interrupt', 'low')
+
+        '''
+        assert busy_mode in MIXADS8568SGDef.BUSY_INT_MODE
+        assert polarity in MIXADS8568SGDef.BUSY_INT_POLARITY
+
+        with self.config() as cfg:
+            cfg.update(MIXADS8568SGDef.INTERRUPT_MODE, MIXADS8568SGDef.BUSY_INT_MODE[busy_mode])
+            cfg.update(MIXADS8568SGDef.ACTIVE_LOW, MIXADS8568SGDef.BUSY_INT_POLARITY[polarity])
+
+        if wait_strategy is None and 'interrupt' == busy_mode:
+            wait_strategy = MIXADS8568SGInterruptWait()
+        if wait_strategy is not None:
+            self.wait_strategy = wait_strategy
+        self.busy_mode = busy_mode
+        self.busy_polarity = polarity
+        self._update_conv_done_level()
+
+    def _update_conv_done_level(self):
+        if 'sw' != self.dev_func_mode:
+            # Mode bits have no effect in hw mode, the pin is BUSY active high.
+            self._conv_done_level = 0
+            return
+        # BUSY is deasserted when conversion is done, INT is asserted when conversion is done.
+        active_level = 1 if 'high' == self.busy_polarity else 0
+        self._conv_done_level = active_level if 'interrupt' == self.busy_mode else 1 - active_level
+
+    def wait_conv_done(self):
+        '''
+        MIXADS8568SG wait for conversion done with the wait strategy.
 
-        self.axi4_bus.write_8bit_inc(MIXADS8568SGDef.MODULE_STATUS, [MIXADS8568SGDef.STATUS[status]])
+        Raises:
+            MIXADS8568SGTimeoutException: conversion is not done before timeout.
+
+        Examples:
+            mixads8568sg.wait_conv_done()
 
-    def write_config_register(self, wr_data):
         '''
-        MIXADS8568SG wirte config register.(0nly effective in sw mode.)
+        if self._stats is None:
+            self.wait_strategy.wait(self.busy, self._conv_done_level)
+            return
+        start = time.perf_counter_ns()
+        polls = self.wait_strategy.wait(self.busy, self._conv_done_level)
+        self._stats.observe('busy_wait', time.perf_counter_ns() - start)
+        self._stats.count('busy_wait.polls', polls)
+
+    def enable_stats(self, stats=None):
+        '''
+        MIXADS8568SG enable instrumentation: bus calls per api and register with latency, pin level
+        writes and reads, busy wait time and polls, and conversions. The bus and pins are wrapped while
+        enabled, so nothing is added to the hot path when disabled.
 
         Args:
-            wr_data:  int, [0x0 ~ 0xFFFFFFFF], data to write.
+            stats:    instance/None, MIXADS8568SGStats to record into, None means a new one.
+
+        Returns:
+            MIXADS8568SGStats, the recorder.
 
         Examples:
-            mixads8568sg.write_config_register(0xC00003FF)
+            mixads8568sg.enable_stats().add_sink(my_sink)
 
         '''
-        assert isinstance(wr_data, int)
-        assert 0x00000000 <= wr_data <= 0xFFFFFFFF
+        self.disable_stats()
+        self._stats = stats or MIXADS8568SGStats()
+        self.axi4_bus = _MIXADS8568SGStatsBus(self.axi4_bus, self._stats)
+        for name in MIXADS8568SGDef.PIN_NAMES:
+            pin = getattr(self, name)
+            if pin is not None:
+                setattr(self, name, _MIXADS8568SGStatsPin(pin, name, self._stats))
+        # Tracked state is keyed by pin instance.
+        self.invalidate()
+        return self._stats
+
+    def disable_stats(self):
+        '''
+        MIXADS8568SG disable instrumentation and unwrap the bus and pins.
 
-        self.axi4_bus.write_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, [wr_data])
+        Examples:
+            mixads8568sg.disable_stats()
 
-    def read_config_register(self):
         '''
-        MIXADS8568SG read config register.(0nly effective in sw mode.)
+        if self._stats is None:
+            return
+        self._stats = None
+        self.axi4_bus = self.axi4_bus.axi4_bus
+        for name in MIXADS8568SGDef.PIN_NAMES:
+            pin = getattr(self, name)
+            if isinstance(pin, _MIXADS8568SGStatsPin):
+                setattr(self, name, pin.pin)
+        self.invalidate()
+
+    def stats(self, reset=False):
+        '''
+        MIXADS8568SG get a snapshot of the instrumentation.
+
+        Args:
+            reset:    bool, clear the statistics after the snapshot.
+
+        Returns:
+            dict, see MIXADS8568SGStats.snapshot, empty counters and histograms if disabled.
 
         Examples:
-            mixads8568sg.read_config_register()
+            mixads8568sg.stats()['counters']['conversions']
 
         '''
-        # Need debug.
-        wr_data = MIXADS8568SGDef.WR_RD_CONFIG_REG | self.current_config_data
-        self.write_config_register(wr_data)
-        self.start_conv('A')
-        # time.sleep(0.001)
-        rd_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, MIXADS8568SGDef.DATA_LEN)
-
-        return rd_data[0]
+        if self._stats is None:
+            return {'counters': {}, 'histograms': {}}
+        return self._stats.snapshot(reset)
 
     def sel_b_ch(self, status):
         '''
@@ -162,7 +1287,7 @@ class MIXADS8568SG(object):
         '''
         assert status in MIXADS8568SGDef.STATUS
 
-        self.axi4_bus.write_8bit_inc(MIXADS8568SGDef.ADS8568_SEL_B, [MIXADS8568SGDef.STATUS[status]])
+        self._write_8bit_reg(MIXADS8568SGDef.ADS8568_SEL_B, MIXADS8568SGDef.STATUS[status])
 
     def sel_cd_ch(self, status):
         '''
@@ -177,7 +1302,7 @@ class MIXADS8568SG(object):
         '''
         assert status in MIXADS8568SGDef.STATUS
 
-        self.axi4_bus.write_8bit_inc(MIXADS8568SGDef.ADS8568_SEL_CD, [MIXADS8568SGDef.STATUS[status]])
+        self._write_8bit_reg(MIXADS8568SGDef.ADS8568_SEL_CD, MIXADS8568SGDef.STATUS[status])
 
     def set_spi_speed(self, speed):
         '''
@@ -192,8 +1317,10 @@ class MIXADS8568SG(object):
         '''
         assert 1 <= speed <= 20000000
 
-        wr_data = (pow(2, 32) * 8 * speed) / 1000000000
-        self.axi4_bus.write_32bit_inc(MIXADS8568SGDef.ADS8568_SEL_CD, [wr_data])
+        with self.bus_lock:
+            wr_data = int((pow(2, 32) * 8 * speed) / 1000000000)
+            self.axi4_bus.write_32bit_inc(MIXADS8568SGDef.ADC_SPI_RATE, [wr_data])
+            self.spi_speed = speed
 
     def adc_ch_pair_en(self, count):
         '''
@@ -208,7 +1335,7 @@ class MIXADS8568SG(object):
         '''
         assert 1 <= count <= 4
 
-        self.axi4_bus.write_8bit_inc(MIXADS8568SGDef.ADC_CHANNEL_EN, [count])
+        self._write_8bit_reg(MIXADS8568SGDef.ADC_CHANNEL_EN, count)
 
     def read_single_ch_data(self, ch_pair):
         '''
@@ -226,25 +1353,50 @@ class MIXADS8568SG(object):
         '''
         assert ch_pair in MIXADS8568SGDef.CHANNEL_PAIR
 
-        rd_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_PAIR[ch_pair], MIXADS8568SGDef.DATA_LEN)
-        return rd_data[0]
+        with self.bus_lock:
+            rd_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_PAIR[ch_pair], 1)
+            return rd_data[0]
+
+    def read_ch_pair_data(self, ch_pairs):
+        '''
+        MIXADS8568SG read the data of several channel pairs in one burst.
+
+        CHANNEL_A_DATA ~ CHANNEL_D_DATA are contiguous, so only the registers from the first to the last
+        needed pair are read, in one bus access.
+
+        Args:
+            ch_pairs:  list, ['A', 'B', 'C', 'D'], list of channel pair.
+
+        Returns:
+            rd_data,  list, data of every channel pair, in the same order as ch_pairs.
+
+        Examples:
+            mixads8568sg.read_ch_pair_data(['A', 'D'])
+
+        '''
+        assert len(ch_pairs) > 0
+        for ch_pair in ch_pairs:
+            assert ch_pair in MIXADS8568SGDef.CHANNEL_PAIR
+
+        with self.bus_lock:
+            first = min(MIXADS8568SGDef.CHANNEL_PAIR[ch_pair] for ch_pair in ch_pairs)
+            last = max(MIXADS8568SGDef.CHANNEL_PAIR[ch_pair] for ch_pair in ch_pairs)
+            rd_data = self.axi4_bus.read_32bit_inc(first, (last - first) // MIXADS8568SGDef.CHANNEL_DATA_WIDTH + 1)
+            return [rd_data[(MIXADS8568SGDef.CHANNEL_PAIR[ch_pair] - first) // MIXADS8568SGDef.CHANNEL_DATA_WIDTH]
+                    for ch_pair in ch_pairs]
 
     def read_all_ch_data(self):
         '''
         MIXADS8568SG read all channels data.
 
         Returns:
-            rd_data,  list.
+            rd_data,  list, data of channel pair A, B, C and D.
 
         Examples:
             mixads8568sg.read_all_ch_data()
 
         '''
-        ch_a_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_A_DATA, MIXADS8568SGDef.DATA_LEN)
-        ch_b_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_B_DATA, MIXADS8568SGDef.DATA_LEN)
-        ch_c_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_C_DATA, MIXADS8568SGDef.DATA_LEN)
-        ch_d_data = self.axi4_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_D_DATA, MIXADS8568SGDef.DATA_LEN)
-        return ch_a_data[0] + ch_b_data[0] + ch_c_data[0] + ch_d_data[0]
+        return self.read_ch_pair_data(MIXADS8568SGDef.CHANNEL_PAIR_LIST)
 
     def sel_mode(self, dev_func_mode='hw'):
         '''
@@ -259,7 +1411,9 @@ class MIXADS8568SG(object):
         '''
         assert dev_func_mode in MIXADS8568SGDef.DEV_FUNC_MODE
 
-        self.hw_sw_sel.set_level(MIXADS8568SGDef.DEV_FUNC_MODE[dev_func_mode])
+        self._set_pin_level(self.hw_sw_sel, MIXADS8568SGDef.DEV_FUNC_MODE[dev_func_mode])
+        self.dev_func_mode = dev_func_mode
+        self._update_conv_done_level()
 
     def init_pins(self):
         '''
@@ -285,6 +1439,7 @@ class MIXADS8568SG(object):
         self.sel_cd.set_dir('output')
         self.sel_b.set_dir('output')
         self.busy.set_dir('input')
+        self.invalidate()
 
     def reset_dev(self):
         '''
@@ -295,11 +1450,26 @@ class MIXADS8568SG(object):
             mixads8568sg.reset_dev()
 
         '''
-        self.reset.set_level(0)
-        time.sleep(0.001)
-        self.reset.set_level(1)
-        time.sleep(0.001)
-        self.reset.set_level(0)
+        with self.bus_lock:
+            self.reset.set_level(0)
+            precise_delay(self.timing.reset_low)
+            self.reset.set_level(1)
+            precise_delay(self.timing.reset_pulse)
+            self.reset.set_level(0)
+            self.current_config_data = MIXADS8568SGDef.CONFIG_DEFAULT
+            # Default CONFIG is 4VREF on every channel pair with the 2.5V reference, in hw mode XCLK keeps
+            # setting the range.
+            self.max_vref_range = 2.5
+            if 'sw' == self.dev_func_mode:
+                self._vrange = '4VREF'
+                for ch_pair in self.pair_vrange:
+                    self.pair_vrange[ch_pair] = '4VREF'
+            self._update_volt_range()
+            # Default CONFIG is BUSY mode, active high.
+            self.busy_mode = 'busy'
+            self.busy_polarity = 'high'
+            self._update_conv_done_level()
+            self.invalidate()
 
     def init_dev(self, dev_func_mode):
         '''
@@ -333,11 +1503,9 @@ class MIXADS8568SG(object):
         '''
         assert max_vref_range in MIXADS8568SGDef.MAX_VREF_OUTPUT_RANGE
 
-        range_mask = MIXADS8568SGDef.MAX_VREF_OUTPUT_RANGE[max_vref_range]
-        rd_data = self.read_config_register()
-        wr_data = rd_data | range_mask
-        self.write_config_register(wr_data)
+        self._update_config(MIXADS8568SGDef.VREF_3000_MV, MIXADS8568SGDef.MAX_VREF_OUTPUT_RANGE[max_vref_range])
         self.max_vref_range = max_vref_range
+        self._update_volt_range()
 
     def set_absolute_volt_range(self, dev_func_mode, vrange, ch_pair='A'):
         '''
@@ -356,13 +1524,42 @@ class MIXADS8568SG(object):
         assert vrange in MIXADS8568SGDef.HW_ABSOLUTE_VOLT_RANGE
         assert ch_pair in MIXADS8568SGDef.SW_ABSOLUTE_VOLT_RANGE
 
-        self.input_volt_range = 4 * self.max_vref_range if '4VREF' == vrange else 2 * self.max_vref_range
+        self._vrange = vrange
         if 'hw' == dev_func_mode:
-            self.xclk.set_level(MIXADS8568SGDef.HW_ABSOLUTE_VOLT_RANGE[vrange])
+            # XCLK sets the range of all channel pairs.
+            for pair in self.pair_vrange:
+                self.pair_vrange[pair] = vrange
+            self._set_pin_level(self.xclk, MIXADS8568SGDef.HW_ABSOLUTE_VOLT_RANGE[vrange])
         else:
-            rd_data = self.read_config_register()
-            wr_data = rd_data | MIXADS8568SGDef.SW_ABSOLUTE_VOLT_RANGE[ch_pair][vrange]
-            self.write_config_register(wr_data)
+            self.pair_vrange[ch_pair] = vrange
+            range_bits = MIXADS8568SGDef.SW_ABSOLUTE_VOLT_RANGE[ch_pair]
+            self._update_config(range_bits['2VREF'], range_bits[vrange])
+        self._update_volt_range()
+
+    def _update_volt_range(self):
+        factor = {'4VREF': 4, '2VREF': 2}
+        self.input_volt_range = factor[self._vrange] * self.max_vref_range
+        for ch_pair, vrange in self.pair_vrange.items():
+            self.pair_volt_range[ch_pair] = factor[vrange] * self.max_vref_range
+        self._volt_tables.clear()
+
+    def set_calibration(self, calibration):
+        '''
+        MIXADS8568SG set the gain and offset calibration of every channel.
+
+        The calibration is folded into the code to volt tables, so calibrated values cost no extra pass.
+
+        Args:
+            calibration:    instance(MIXADS8568SGCalibration)/None, None means no calibration.
+
+        Examples:
+            ads8568.set_calibration(MIXADS8568SGCalibration.load('/tmp/ads8568.cal'))
+
+        '''
+        assert calibration is None or isinstance(calibration, MIXADS8568SGCalibration)
+
+        self.calibration = calibration or MIXADS8568SGCalibration()
+        self._volt_tables.clear()
 
     def set_inter_vref(self, dev_func_mode, internal_ref_volt):
         '''
@@ -379,18 +1576,17 @@ class MIXADS8568SG(object):
         assert dev_func_mode in MIXADS8568SGDef.DEV_FUNC_MODE
         assert 0.5 <= internal_ref_volt <= 3.0
 
-        code = (1024 * internal_ref_volt) / self.max_vref_range - 1
-        rd_data = self.read_config_register()
-        wr_data = rd_data | code
-        self.write_config_register(wr_data)
+        code = int((1024 * internal_ref_volt) / self.max_vref_range - 1)
+        code = min(max(code, 0), MIXADS8568SGDef.VREF_DAC_MASK)
+        with self.config() as cfg:
+            cfg.update(MIXADS8568SGDef.VREF_DAC_MASK, code)
+            if 'sw' == dev_func_mode:
+                # Internal reference enable in sw mode.
+                cfg.set_bits(MIXADS8568SGDef.INTERNAL_VREF_EN)
 
         if 'hw' == dev_func_mode:
             # Internal reference enable in hw mode.
-            self.ref_sel.set_level(1)
-        else:
-            # Internal reference enable in sw mode.
-            wr_data |= MIXADS8568SGDef.INTERNAL_VREF_EN
-            self.write_config_register(wr_data)
+            self._set_pin_level(self.ref_sel, 1)
 
     def start_conv(self, ch_pair):
         '''
@@ -403,53 +1599,147 @@ class MIXADS8568SG(object):
             ads8568.start_conv('A')
 
         '''
+        self.start_conv_group([ch_pair])
+
+    def _convst_pins(self, ch_pairs):
+        # CONVST pins of the channel pairs, with duplicate removed.
         channel = {'A': self.convst_a, 'B': self.convst_b,
                    'C': self.convst_c, 'D': self.convst_d}
-        assert ch_pair in channel
+        pins = []
+        for ch_pair in ch_pairs:
+            assert ch_pair in channel
+            if channel[ch_pair] not in pins:
+                pins.append(channel[ch_pair])
+        return pins
+
+    def _flush_posted_writes(self):
+        # Posted register writes must reach the IP before the conversion starts.
+        flush = getattr(self.axi4_bus, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def start_conv_group(self, ch_pairs):
+        '''
+        MIXADS8568SG start converting several channel pairs at the same instant, active high.
+
+        All selected CONVST pins are raised together, held for the pulse width and lowered together,
+        so the pairs are sampled simultaneously and take one conversion time.
+
+        Args:
+            ch_pairs:    list, ['A', 'B', 'C', 'D'], list of channel pair.
+
+        Examples:
+            ads8568.start_conv_group(['A', 'B', 'C', 'D'])
+
+        '''
+        pins = self._convst_pins(ch_pairs)
+
+        with self.bus_lock:
+            self._flush_posted_writes()
+            # CONVST stays low between conversions, so the first edge is mostly skipped.
+            for pin in pins:
+                self._set_pin_level(pin, 0)
+            precise_delay(self.timing.convst_low)
+            for pin in pins:
+                self._set_pin_level(pin, 1)
+            precise_delay(self.timing.convst_high)
+            for pin in pins:
+                self._set_pin_level(pin, 0)
+        if self._stats is not None:
+            self._stats.count('conversions', len(pins))
+
+    def _get_volt_table(self, ch=None):
+        '''
+        MIXADS8568SG get the code to volt table of a channel.
+
+        Args:
+            ch:    int/None, [1~8], channel, its pair range and calibration are used. None means
+                   input_volt_range without calibration.
 
-        channel[ch_pair].set_level(0)
-        time.sleep(0.001)
-        channel[ch_pair].set_level(1)
-        time.sleep(0.001)
-        channel[ch_pair].set_level(0)
+        Returns:
+            (table, np_table), tuple, see MIXADS8568SGVoltTable.get.
 
-    def _code_2_mvolt(self, code):
+        '''
+        if ch is None:
+            key = (self.input_volt_range, 1.0, 0.0)
+        else:
+            key = (self.pair_volt_range[MIXADS8568SGDef.CHANNEL[ch]],) + self.calibration.get(ch)
+        volt_table = self._volt_tables.get(ch)
+        # The key is also compared, so that a range assigned directly or a calibration changed in place
+        # is not missed.
+        if volt_table is None or volt_table[0] != key:
+            volt_table = (key,) + volt_table_cache.get(*key)
+            self._volt_tables[ch] = volt_table
+        return volt_table[1:]
+
+    def _code_2_mvolt(self, code, ch_pair=None):
         '''
         MIXADS8568SG translate the code value to voltage value.
 
         Args:
-            code:    int, code value.
+            code:       int, code value.
+            ch_pair:    string/None, ['A', 'B', 'C', 'D'], channel pair of the code, its range and the
+                        calibration of its channels are used. None means input_volt_range without calibration.
 
         Examples:
-            ads8568._code_2_mvolt(0x1234)
+            ads8568._code_2_mvolt(0x1234, 'A')
 
         '''
-        # assert 0 <= code <= 0xFFFF
-
-        # When Singular channel number.
-        # if (0 <= code <= 0x7FFF):
-        #     volt0 = (((code >> 16) & 0x0000FFFF) / MIXADS8568SGDef.POSITIVE_FULL_SCALE) * self.input_volt_range
-        #     # When dual channel number
-        #     volt1 = (code & 0x0000FFFF) * MIXADS8568SGDef.POSITIVE_FULL_SCALE * self.input_volt_range
-        # elif (0x8000 <= code <= 0xFFFF):
-        #     volt0 = -(((code >> 16) & 0x0000FFFF) / MIXADS8568SGDef.POSITIVE_FULL_SCALE) * self.input_volt_range
-        #     # When dual channel number
-        #     volt1 = -(code & 0x0000FFFF) * MIXADS8568SGDef.POSITIVE_FULL_SCALE * self.input_volt_range
         assert 0 <= code <= 0xFFFFFFFF
 
-        code0 = (((code >> 16) & 0x0000FFFF))
-        code1 = (code & 0x0000FFFF)
-        if (0 <= code0 <= 0x7FFF):
-            volt0 = (code0 / MIXADS8568SGDef.POSITIVE_FULL_SCALE) * self.input_volt_range
-        elif (0x8000 <= code0 <= 0xFFFF):
-            volt0 = -(code0 / MIXADS8568SGDef.POSITIVE_FULL_SCALE) * self.input_volt_range
+        if ch_pair is None:
+            table0 = table1 = self._get_volt_table()[0]
+        else:
+            ch = MIXADS8568SGDef.PAIR_CHANNEL[ch_pair]
+            table0 = self._get_volt_table(ch)[0]
+            table1 = self._get_volt_table(ch + 1)[0]
+        return [table0[(code >> 16) & 0x0000FFFF], table1[code & 0x0000FFFF]]
+
+    def code_2_volt_batch(self, codes, ch_pair=None):
+        '''
+        MIXADS8568SG translate a block of channel pair data to voltage value in one pass.
+
+        NumPy is used when it is installed, otherwise the pure python path gives the same result.
+
+        Args:
+            codes:      list/array('I')/numpy.ndarray, [0x0 ~ 0xFFFFFFFF], channel pair data,
+                        as returned by read_single_ch_data.
+            ch_pair:    string/None, ['A', 'B', 'C', 'D'], channel pair of the codes, see _code_2_mvolt.
+
+        Returns:
+            (volt0, volt1), tuple, volt0 is the odd channel and volt1 is the even channel of the pair,
+                            numpy.ndarray of float64 when NumPy is installed, else array('d').
 
-        if (0 <= code1 <= 0x7FFF):
-            volt1 = (code1 / MIXADS8568SGDef.POSITIVE_FULL_SCALE) * self.input_volt_range
-        elif (0x8000 <= code1 <= 0xFFFF):
-            volt1 = -(code1 / MIXADS8568SGDef.POSITIVE_FULL_SCALE) * self.input_volt_range
+        Examples:
+            volt0, volt1 = ads8568.code_2_volt_batch([0x1234FF78, 0x7FFF8000])
+
+        '''
+        if ch_pair is None:
+            table0, np_table0 = table1, np_table1 = self._get_volt_table()
+        else:
+            ch = MIXADS8568SGDef.PAIR_CHANNEL[ch_pair]
+            table0, np_table0 = self._get_volt_table(ch)
+            table1, np_table1 = self._get_volt_table(ch + 1)
+        if np_table0 is not None:
+            codes = np.asarray(codes, dtype=np.uint32)
+            volt0 = np_table0[codes >> 16]
+            volt1 = np_table1[codes & 0x0000FFFF]
+            return volt0, volt1
+
+        volt0 = array('d', [table0[(code >> 16) & 0x0000FFFF] for code in codes])
+        volt1 = array('d', [table1[code & 0x0000FFFF] for code in codes])
+        return volt0, volt1
+
+    def _sel_all_ch_pair(self):
+        '''
+        MIXADS8568SG select channel pair B, C and D, so that every channel maps one-to-one to its own pair.
 
-        return [volt0, volt1]
+        '''
+        # Channel one-to-one correspondence.
+        self._set_pin_level(self.sel_cd, 1)
+        self.sel_cd_ch('enable')
+        self._set_pin_level(self.sel_b, 1)
+        self.sel_b_ch('enable')
 
     # def ads8568_read_ch(self, ch, range, mode, polarity):
 
@@ -468,25 +1758,21 @@ class MIXADS8568SG(object):
         '''
         assert ch in MIXADS8568SGDef.CHANNEL
 
-        # Channel one-to-one correspondence.
-        self.sel_cd.set_level(1)
-        self.sel_cd_ch('enable')
-        self.sel_b.set_level(1)
-        self.sel_b_ch('enable')
+        with self.bus_lock:
+            self._sel_all_ch_pair()
 
-        # Conversion start
-        self.start_conv(MIXADS8568SGDef.CHANNEL[ch])
-        time.sleep(0.001)
-        while self.busy.get_level():
-            pass
-        self.adc_ch_pair_en(1)
-        # Get volt.
-        # Call spi bus read api with corresponding pin.
-        code = self.read_single_ch_data(MIXADS8568SGDef.CHANNEL[ch])
-        rd_data = self._code_2_mvolt(code)
-        volt = rd_data[0] if (ch % 2) != 0 else rd_data[1]
+            # Conversion start
+            self.start_conv(MIXADS8568SGDef.CHANNEL[ch])
+            precise_delay(self.timing.conv_wait)
+            self.wait_conv_done()
+            self.adc_ch_pair_en(1)
+            # Get volt.
+            # Call spi bus read api with corresponding pin.
+            code = self.read_single_ch_data(MIXADS8568SGDef.CHANNEL[ch])
+            rd_data = self._code_2_mvolt(code, MIXADS8568SGDef.CHANNEL[ch])
+            volt = rd_data[0] if (ch % 2) != 0 else rd_data[1]
 
-        return volt
+            return volt
 
     def scan_ch(self, ch_list):
         '''
@@ -502,62 +1788,726 @@ class MIXADS8568SG(object):
             ads8568.scan_ch([1, 2 ,5, 8])
         '''
         assert isinstance(ch_list, list)
-        for x in range(len(ch_list)):
-            assert ch_list[x] in MIXADS8568SGDef.CHANNEL
 
-        # Channel one-to-one correspondence.
-        self.sel_cd.set_level(1)
-        self.sel_cd_ch('enable')
-        self.sel_b.set_level(1)
-        self.sel_b_ch('enable')
+        plan = self._get_scan_plan(ch_list)
+        with self.bus_lock:
+            self._sel_all_ch_pair()
+
+            # A conversion start must not be issued during an ongoing conversion on the corresponding channel pair.
+            self.start_conv_group(plan.ch_pairs)
+            precise_delay(self.timing.conv_wait)
+            # Wait for conversion.
+            self.wait_conv_done()
+            self.adc_ch_pair_en(4)
+            # Get volt.
+            rd_data = self.axi4_bus.read_32bit_inc(plan.addr, plan.rd_len)
+            return [self._get_volt_table(ch)[0][(rd_data[index] >> shift) & 0x0000FFFF]
+                    for ch, (index, shift) in zip(plan.channels, plan.slots)]
+
+    def _get_scan_plan(self, ch_list):
+        '''
+        MIXADS8568SG get the compiled scan plan of a channel list, compile and cache it on first use.
+
+        Args:
+            ch_list:    list, [1~8], list of channel.
+
+        Returns:
+            MIXADS8568SGScanPlan.
+
+        '''
+        key = tuple(ch_list)
+        # The cache is shared by foreground scans and background acquisition, it is only touched under bus_lock.
+        with self.bus_lock:
+            plan = self._scan_plans.get(key)
+            if plan is not None:
+                self._scan_plans.move_to_end(key)
+                return plan
+
+        assert len(key) > 0
+        for ch in key:
+            assert ch in MIXADS8568SGDef.CHANNEL
+        # Get whole channel pair with duplicate removed.
+        ch_pairs = []
+        for ch in key:
+            if MIXADS8568SGDef.CHANNEL[ch] not in ch_pairs:
+                ch_pairs.append(MIXADS8568SGDef.CHANNEL[ch])
+        # CHANNEL_A_DATA ~ CHANNEL_D_DATA are contiguous, read the registers from the first to the last pair once.
+        addr = min(MIXADS8568SGDef.CHANNEL_PAIR[ch_pair] for ch_pair in ch_pairs)
+        last = max(MIXADS8568SGDef.CHANNEL_PAIR[ch_pair] for ch_pair in ch_pairs)
+        rd_len = (last - addr) // MIXADS8568SGDef.CHANNEL_DATA_WIDTH + 1
+        # Odd channel is the high half-word of the pair data, even channel is the low half-word.
+        slots = tuple(((MIXADS8568SGDef.CHANNEL_PAIR[MIXADS8568SGDef.CHANNEL[ch]] - addr) //
+                       MIXADS8568SGDef.CHANNEL_DATA_WIDTH, 16 if ch % 2 else 0) for ch in key)
+        plan = MIXADS8568SGScanPlan(key, tuple(ch_pairs), addr, rd_len, slots)
+
+        with self.bus_lock:
+            self._scan_plans[key] = plan
+            if len(self._scan_plans) > MIXADS8568SGDef.SCAN_PLAN_CACHE_SIZE:
+                self._scan_plans.popitem(last=False)
+        return plan
+
+    def stream(self, channels, n_samples=None, block_size=MIXADS8568SGDef.STREAM_BLOCK_SIZE):
+        '''
+        MIXADS8568SG continuous streaming acquisition.
+
+        Channel pair selection is set up once, then every sample only does convert, wait and read.
+        Samples are yielded in blocks, one block is a list of samples and one sample is a list of
+        volt values in the same order as channels.
+
+        Args:
+            channels:      list, [1~8], list of channel.
+            n_samples:     int/None, total number of samples to acquire, None means endless.
+            block_size:    int, [1~], number of samples in one yielded block.
+
+        Returns:
+            generator, yield list of samples.
+
+        Examples:
+            for block in ads8568.stream([1, 3], 1000):
+                print(block)
+        '''
+        assert isinstance(channels, list) and len(channels) > 0
+        for ch in channels:
+            assert ch in MIXADS8568SGDef.CHANNEL
+        assert n_samples is None or n_samples >= 0
+        assert block_size >= 1
+
+        return self._stream(channels, n_samples, block_size)
+
+    def acquire(self, buffer, n_samples):
+        '''
+        MIXADS8568SG acquire samples of buffer.channels into a sample ring buffer.
+
+        Raw codes and the perf_counter_ns time of every conversion start are stored, volt values are
+        only computed when the buffer is read.
+
+        Args:
+            buffer:       instance(MIXADS8568SGSampleBuffer), buffer to write.
+            n_samples:    int, [0~], number of samples to acquire.
+
+        Examples:
+            buffer = MIXADS8568SGSampleBuffer([1, 2, 3], 100000)
+            ads8568.acquire(buffer, 1000)
+            timestamps, volts = buffer.read(ads8568.pair_volt_range, calibration=ads8568.calibration)
+
+        '''
+        assert isinstance(buffer, MIXADS8568SGSampleBuffer)
+        assert n_samples >= 0
+
+        ch_pairs, slots = self._setup_acquisition(buffer.channels)
+        for i in range(n_samples):
+            timestamp = time.perf_counter_ns()
+            buffer.append_pair_data(timestamp, self._conv_ch_pair(ch_pairs), slots)
+
+    def scan_ch_stats(self, ch_list, n):
+        '''
+        MIXADS8568SG oversample multiple channel with back-to-back conversions and get running statistics.
+
+        Mean, min, max, RMS and standard deviation are accumulated on the raw integer codes, memory is
+        constant per channel and codes are converted to volt once at the end.
+
+        Args:
+            ch_list:    list, [1~8], list of channel.
+            n:          int, [1~], number of conversions.
+
+        Returns:
+            list, dict of 'mean', 'min', 'max', 'rms' and 'std' in volt for every channel of ch_list.
+
+        Examples:
+            stats = ads8568.scan_ch_stats([1, 2], 256)
+            print(stats[0]['mean'], stats[0]['std'])
+        '''
+        assert isinstance(ch_list, list) and len(ch_list) > 0
+        for ch in ch_list:
+            assert ch in MIXADS8568SGDef.CHANNEL
+        assert n >= 1
+
+        ch_pairs, slots = self._setup_acquisition(ch_list)
+        width = len(slots)
+        sums = [0] * width
+        squares = [0] * width
+        mins = [MIXADS8568SGDef.CODE_MODULUS] * width
+        maxs = [-MIXADS8568SGDef.CODE_MODULUS] * width
+        for i in range(n):
+            pair_data = self._conv_ch_pair(ch_pairs)
+            for j in range(width):
+                index, shift = slots[j]
+                code = (pair_data[index] >> shift) & 0x0000FFFF
+                if code & MIXADS8568SGDef.SIGN_BIT:
+                    code -= MIXADS8568SGDef.CODE_MODULUS
+                sums[j] += code
+                squares[j] += code * code
+                if code < mins[j]:
+                    mins[j] = code
+                if code > maxs[j]:
+                    maxs[j] = code
+
+        result = []
+        for j in range(width):
+            ch = ch_list[j]
+            lsb = self.pair_volt_range[MIXADS8568SGDef.CHANNEL[ch]] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+            gain, offset = self.calibration.get(ch)
+            # Calibration is linear, volt = code * scale + offset.
+            scale = lsb * gain
+            mean = float(sums[j]) / n
+            mean_square = float(squares[j]) / n
+            # Integer variance numerator keeps full precision: n^2 * var = n * sum(x^2) - sum(x)^2.
+            variance = float(n * squares[j] - sums[j] * sums[j]) / (n * n)
+            low, high = sorted([mins[j] * scale + offset, maxs[j] * scale + offset])
+            result.append({'mean': mean * scale + offset,
+                           'min': low,
+                           'max': high,
+                           'rms': math.sqrt(max(0.0, mean_square * scale * scale +
+                                                2 * mean * scale * offset + offset * offset)),
+                           'std': math.sqrt(variance) * abs(scale)})
+        return result
+
+    def read_ch_averaged(self, ch, n):
+        '''
+        MIXADS8568SG read single channel averaged over n back-to-back conversions.
 
-        tmp = []
-        # A conversion start must not be issued during an ongoing conversion on the corresponding channel pair.
-        # Get whole channel pair.
-        for i in range(len(ch_list)):
-            tmp.append(MIXADS8568SGDef.CHANNEL[ch_list[i]])
-        # Remove duplicate channel pair.
-        ch_pair = set(tmp)
-        for ch in ch_pair:
-            self.start_conv(ch)
-        # self.start_conv(MIXADS8568SGDef.CHANNEL[ch])
-        time.sleep(0.001)
-        # Wait for conversion.
-        while self.busy.get_level():
+        Args:
+            ch:    int, [1~8], channel.
+            n:     int, [1~], number of conversions.
+
+        Returns:
+            volt,  float, mean volt value.
+
+        Examples:
+            ads8568.read_ch_averaged(2, 64)
+        '''
+        assert ch in MIXADS8568SGDef.CHANNEL
+
+        return self.scan_ch_stats([ch], n)[0]['mean']
+
+    def _setup_acquisition(self, channels):
+        '''
+        MIXADS8568SG select channel pairs and enable pair count once for a run of conversions.
+
+        Returns:
+            (ch_pairs, slots), tuple, ch_pairs is the list of channel pair to convert, slots is the
+                               (index in ch_pairs, shift of half-word) of every channel.
+
+        '''
+        # Get whole channel pair with duplicate removed, keep the order of channels.
+        ch_pairs = []
+        for ch in channels:
+            if MIXADS8568SGDef.CHANNEL[ch] not in ch_pairs:
+                ch_pairs.append(MIXADS8568SGDef.CHANNEL[ch])
+        # Odd channel is the high half-word of the pair data, even channel is the low half-word.
+        slots = [(ch_pairs.index(MIXADS8568SGDef.CHANNEL[ch]), 16 if ch % 2 else 0) for ch in channels]
+
+        self._sel_ch_pair(ch_pairs)
+        return ch_pairs, slots
+
+    def _sel_ch_pair(self, ch_pairs):
+        with self.bus_lock:
+            self._sel_all_ch_pair()
+            self.adc_ch_pair_en(1 if len(ch_pairs) == 1 else 4)
+
+    def _conv_ch_pair(self, ch_pairs):
+        '''
+        MIXADS8568SG convert channel pairs together and read their data, holding the bus lock.
+
+        Returns:
+            list, data of every channel pair, in the same order as ch_pairs.
+
+        '''
+        with self.bus_lock:
+            self.start_conv_group(ch_pairs)
+            precise_delay(self.timing.conv_wait)
+            self.wait_conv_done()
+            return self.read_ch_pair_data(ch_pairs)
+
+    def _stream(self, channels, n_samples, block_size):
+        # Setup only once for the whole stream.
+        ch_pairs, slots = self._setup_acquisition(channels)
+        slots = [(index, 0 if shift else 1) for index, shift in slots]
+
+        count = 0
+        block = []
+        while n_samples is None or count < n_samples:
+            pair_data = self._conv_ch_pair(ch_pairs)
+            pair_volt = [self._code_2_mvolt(code, ch_pair) for code, ch_pair in zip(pair_data, ch_pairs)]
+            block.append([pair_volt[index][half] for index, half in slots])
+            count += 1
+            if len(block) >= block_size:
+                yield block
+                block = []
+        if block:
+            yield block
+
+    def _get_busy_level(self):
+        with self.bus_lock:
+            return self.busy.get_level()
+
+    async def _await_conv_done(self, executor):
+        loop = asyncio.get_running_loop()
+        async_wait = getattr(self.wait_strategy, 'async_wait', None)
+        if async_wait is None:
+            # A strategy without async_wait blocks a worker thread for the wait.
+            await loop.run_in_executor(executor, self.wait_conv_done)
+            return
+
+        async def get_level():
+            return await loop.run_in_executor(executor, self._get_busy_level)
+
+        start = time.perf_counter_ns()
+        polls = await async_wait(get_level, self._conv_done_level)
+        if self._stats is not None:
+            self._stats.observe('busy_wait', time.perf_counter_ns() - start)
+            self._stats.count('busy_wait.polls', polls)
+
+    async def _aconv_ch_pair(self, ch_pairs, executor):
+        loop = asyncio.get_running_loop()
+        # An asyncio lock belongs to one event loop.
+        if self._async_lock is None or self._async_lock[0] is not loop:
+            self._async_lock = (loop, asyncio.Lock())
+        # Coroutines on the same device take turns. Every bus access runs in the executor and holds
+        # bus_lock only for itself, the conversion wait and BUSY polling are awaited.
+        async with self._async_lock[1]:
+            await loop.run_in_executor(executor, self._sel_ch_pair, ch_pairs)
+            await loop.run_in_executor(executor, self.start_conv_group, ch_pairs)
+            await asyncio.sleep(self.timing.conv_wait / 1000000000.0)
+            await self._await_conv_done(executor)
+            return await loop.run_in_executor(executor, self.read_ch_pair_data, ch_pairs)
+
+    async def aread_ch(self, ch, executor=None):
+        '''
+        MIXADS8568SG read single channel without blocking the event loop.
+
+        The conversion wait and the wait strategy are awaited, blocking bus calls run in the executor,
+        each holding the bus lock only for itself.
+
+        Args:
+            ch:          int, [1~8], channel.
+            executor:    instance/None, concurrent.futures.Executor, None means the default executor of the loop.
+
+        Returns:
+            volt,  float, volt value.
+
+        Examples:
+            volt = await ads8568.aread_ch(2)
+        '''
+        assert ch in MIXADS8568SGDef.CHANNEL
+
+        pair_data = await self._aconv_ch_pair([MIXADS8568SGDef.CHANNEL[ch]], executor)
+        rd_data = self._code_2_mvolt(pair_data[0], MIXADS8568SGDef.CHANNEL[ch])
+        return rd_data[0] if (ch % 2) != 0 else rd_data[1]
+
+    async def ascan_ch(self, ch_list, executor=None):
+        '''
+        MIXADS8568SG read multiple channel without blocking the event loop.
+
+        All channel pairs are converted together. The conversion wait and the wait strategy are
+        awaited, blocking bus calls run in the executor, each holding the bus lock only for itself.
+
+        Args:
+            ch_list:     list, [1~8], list of channel.
+            executor:    instance/None, concurrent.futures.Executor, None means the default executor of the loop.
+
+        Returns:
+            volt, list, volt value.
+
+        Examples:
+            volts = await ads8568.ascan_ch([1, 2, 5, 8])
+        '''
+        assert isinstance(ch_list, list)
+        for ch in ch_list:
+            assert ch in MIXADS8568SGDef.CHANNEL
+
+        ch_pairs = []
+        for ch in ch_list:
+            if MIXADS8568SGDef.CHANNEL[ch] not in ch_pairs:
+                ch_pairs.append(MIXADS8568SGDef.CHANNEL[ch])
+        pair_data = await self._aconv_ch_pair(ch_pairs, executor)
+        pair_volt = dict((ch_pair, self._code_2_mvolt(code, ch_pair)) for code, ch_pair in zip(pair_data, ch_pairs))
+        return [pair_volt[MIXADS8568SGDef.CHANNEL[ch]][0 if ch % 2 else 1] for ch in ch_list]
+
+    def start_background_acquisition(self, channels, rate=None, block_size=MIXADS8568SGDef.STREAM_BLOCK_SIZE,
+                                     queue_size=MIXADS8568SGDef.QUEUE_SIZE, policy='block'):
+        '''
+        MIXADS8568SG start acquisition on a dedicated thread, sample blocks are delivered through a
+        bounded queue.
+
+        Args:
+            channels:      list, [1~8], list of channel.
+            rate:          float/None, unit Hz, sample rate, None means as fast as possible.
+            block_size:    int, [1~], number of samples in one block.
+            queue_size:    int, [1~], maximum number of blocks in the queue.
+            policy:        string, ['block', 'drop_oldest', 'drop_newest'], what to do when the queue is full.
+
+        Returns:
+            MIXADS8568SGBackgroundAcquisition, started acquisition.
+
+        Examples:
+            acq = ads8568.start_background_acquisition([1, 2], 1000, policy='drop_oldest')
+            timestamps, samples = acq.get()
+            acq.stop()
+
+        '''
+        acquisition = MIXADS8568SGBackgroundAcquisition(self, channels, rate, block_size, queue_size, policy)
+        if rate is not None:
+            self._check_sample_rate(channels, rate)
+        acquisition.start()
+        return acquisition
+
+    def max_sample_rate(self, channels):
+        '''
+        MIXADS8568SG get the highest sample rate the timing profile, the conversion time and the SPI speed allow.
+
+        One sample is a CONVST pulse, the conversion and reading 32bit of every enabled channel pair over
+        SPI; the SPI part is only counted after set_spi_speed. Bus and Python overhead are not counted,
+        they show as missed deadlines of MIXADS8568SGScheduler.
+
+        Args:
+            channels:    list, [1~8], list of channel of every sample.
+
+        Returns:
+            float, unit Hz, maximum sample rate.
+
+        Examples:
+            rate = ads8568.max_sample_rate([1, 2, 3, 4])
+
+        '''
+        assert isinstance(channels, list) and len(channels) > 0
+        for ch in channels:
+            assert ch in MIXADS8568SGDef.CHANNEL
+
+        ch_pairs = set(MIXADS8568SGDef.CHANNEL[ch] for ch in channels)
+        period = self.timing.convst_low + self.timing.convst_high + \
+            max(self.timing.conv_wait, MIXADS8568SGDef.CONV_TIME_NS)
+        if self.spi_speed:
+            # Same pair count as _sel_ch_pair enables.
+            bits = MIXADS8568SGDef.PAIR_DATA_BITS * (1 if len(ch_pairs) == 1 else len(MIXADS8568SGDef.CHANNEL_PAIR))
+            period += bits * 1000000000.0 / self.spi_speed
+        return 1000000000.0 / period
+
+    def _check_sample_rate(self, channels, rate):
+        max_rate = self.max_sample_rate(channels)
+        if rate > max_rate:
+            raise MIXADS8568SGException('sample rate %g Hz of channel %s is higher than the maximum %g Hz '
+                                        'of the timing profile and SPI speed' % (rate, channels, max_rate))
+
+    def scheduler(self, channels, rate, overrun='skip'):
+        '''
+        MIXADS8568SG create a fixed-rate sampling scheduler.
+
+        Args:
+            channels:    list, [1~8], list of channel of every sample.
+            rate:        float, unit Hz, sample rate.
+            overrun:     string, ['skip', 'catch_up'], see MIXADS8568SGScheduler.
+
+        Returns:
+            MIXADS8568SGScheduler.
+
+        Raises:
+            MIXADS8568SGException: rate is higher than max_sample_rate.
+
+        Examples:
+            scheduler = ads8568.scheduler([1, 2, 3, 4], 1000)
+            timestamps, samples = scheduler.run(1000)
+            print(scheduler.report())
+
+        '''
+        scheduler = MIXADS8568SGScheduler(self, channels, rate, overrun)
+        self._check_sample_rate(channels, rate)
+        return scheduler
+
+
+class MIXADS8568SGBackgroundAcquisition(object):
+    '''
+    MIXADS8568SGBackgroundAcquisition runs the convert and read loop of MIXADS8568SG on its own thread.
+
+    Every block is a tuple (timestamps, samples), timestamps is the list of perf_counter_ns time of the
+    conversion starts, samples is the list of samples and one sample is a list of volt values in the
+    same order as channels. Every conversion holds the bus lock of the driver, so foreground calls
+    are done between conversions.
+
+    Args:
+        ads8568:       instance(MIXADS8568SG), driver to acquire from.
+        channels:      list, [1~8], list of channel.
+        rate:          float/None, unit Hz, sample rate, None means as fast as possible.
+        block_size:    int, [1~], number of samples in one block.
+        queue_size:    int, [1~], maximum number of blocks in the queue.
+        policy:        string, ['block', 'drop_oldest', 'drop_newest'], what to do when the queue is full,
+                       'block' waits for the consumer, 'drop_oldest' discards the oldest queued block,
+                       'drop_newest' discards the new block.
+
+    Examples:
+        acq = MIXADS8568SGBackgroundAcquisition(ads8568, [1, 2], 1000)
+        acq.start()
+        timestamps, samples = acq.get(timeout=1)
+        acq.stop()
+
+    '''
+
+    def __init__(self, ads8568, channels, rate=None, block_size=MIXADS8568SGDef.STREAM_BLOCK_SIZE,
+                 queue_size=MIXADS8568SGDef.QUEUE_SIZE, policy='block'):
+        assert isinstance(channels, list) and len(channels) > 0
+        for ch in channels:
+            assert ch in MIXADS8568SGDef.CHANNEL
+        assert rate is None or rate > 0
+        assert block_size >= 1
+        assert queue_size >= 1
+        assert policy in MIXADS8568SGDef.BACKPRESSURE_POLICY
+
+        self.ads8568 = ads8568
+        self.channels = list(channels)
+        self.rate = rate
+        self.block_size = block_size
+        self.policy = policy
+        self.queue = queue.Queue(queue_size)
+        self.dropped = 0
+        self.error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        '''
+        Start the acquisition thread.
+
+        '''
+        assert self._thread is None
+        self._thread = threading.Thread(target=self._run, name='MIXADS8568SG-acquisition')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def is_running(self):
+        '''
+        Returns:
+            bool, True if the acquisition thread is alive.
+
+        '''
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout=None):
+        '''
+        Request the acquisition thread to stop and join it. The partial block is still queued
+        unless the queue is full.
+
+        Args:
+            timeout:    float/None, unit s, join timeout, None means wait until the thread ends.
+
+        Raises:
+            Exception: the exception which stopped the acquisition thread, if any.
+
+        '''
+        self._stop_event.set()
+        self.join(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def join(self, timeout=None):
+        '''
+        Wait until the acquisition thread ends.
+
+        Args:
+            timeout:    float/None, unit s, None means wait forever.
+
+        '''
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get(self, block=True, timeout=None):
+        '''
+        Get the next sample block.
+
+        Args:
+            block:      bool, wait for a block if the queue is empty.
+            timeout:    float/None, unit s, maximum wait time.
+
+        Returns:
+            (timestamps, samples), tuple, see class description.
+
+        Raises:
+            queue.Empty: no block is available.
+
+        '''
+        return self.queue.get(block, timeout)
+
+    def _put(self, item):
+        if 'block' == self.policy:
+            while not self._stop_event.is_set():
+                try:
+                    self.queue.put(item, True, MIXADS8568SGDef.STOP_POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    pass
+            # Stopping, keep the block only if there is room.
+            policy = 'drop_newest'
+        else:
+            policy = self.policy
+
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
             pass
-        self.adc_ch_pair_en(4)
-        # Get volt.
-        result_list = []
-        for i in range(len(ch_list)):
-            code = self.read_single_ch_data(ch_list[i])
-            rd_data = self._code_2_mvolt(code)
-            if 'A' == MIXADS8568SGDef.CHANNEL[ch_list[i]]:
-                if 1 == ch_list[i]:
-                    volt_ch1 = rd_data[0]
-                    result_list.append(volt_ch1)
-                elif 2 == ch_list[i]:
-                    volt_ch2 = rd_data[1]
-                    result_list.append(volt_ch2)
-            elif 'B' == MIXADS8568SGDef.CHANNEL[ch_list[i]]:
-                if 3 == ch_list[i]:
-                    volt_ch3 = rd_data[0]
-                    result_list.append(volt_ch3)
-                elif 4 == ch_list[i]:
-                    volt_ch4 = rd_data[0]
-                    result_list.append(volt_ch4)
-            elif 'C' == MIXADS8568SGDef.CHANNEL[ch_list[i]]:
-                if 5 == ch_list[i]:
-                    volt_ch5 = rd_data[0]
-                    result_list.append(volt_ch5)
-                elif 6 == ch_list[i]:
-                    volt_ch6 = rd_data[0]
-                    result_list.append(volt_ch6)
-            elif 'D' == MIXADS8568SGDef.CHANNEL[ch_list[i]]:
-                if 7 == ch_list[i]:
-                    volt_ch7 = rd_data[0]
-                    result_list.append(volt_ch7)
-                elif 8 == ch_list[i]:
-                    volt_ch8 = rd_data[0]
-                    result_list.append(volt_ch8)
-
-        return result_list
+        if 'drop_oldest' == policy:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                pass
+        self.dropped += 1
+
+    def _run(self):
+        ads8568 = self.ads8568
+        period = int(1000000000 / self.rate) if self.rate else 0
+        timestamps = []
+        samples = []
+        try:
+            # A setup failure is reported like a read failure.
+            ch_pairs, slots = ads8568._setup_acquisition(self.channels)
+            next_time = time.perf_counter_ns()
+            while not self._stop_event.is_set():
+                if period:
+                    remaining = next_time - time.perf_counter_ns()
+                    if remaining > MIXADS8568SGDef.SLEEP_THRESHOLD_NS:
+                        # Coarse sleep which is woken up by stop, then fine delay.
+                        if self._stop_event.wait((remaining - MIXADS8568SGDef.SLEEP_THRESHOLD_NS) / 1000000000.0):
+                            break
+                        remaining = next_time - time.perf_counter_ns()
+                    precise_delay(remaining)
+                    next_time += period
+
+                with ads8568.bus_lock:
+                    # Selection is re-checked every conversion, it only costs bus access after a
+                    # foreground call changed it.
+                    ads8568._sel_ch_pair(ch_pairs)
+                    timestamp = time.perf_counter_ns()
+                    pair_data = ads8568._conv_ch_pair(ch_pairs)
+                pair_volt = [ads8568._code_2_mvolt(code, ch_pair) for code, ch_pair in zip(pair_data, ch_pairs)]
+                timestamps.append(timestamp)
+                samples.append([pair_volt[index][0 if shift else 1] for index, shift in slots])
+                if len(samples) >= self.block_size:
+                    self._put((timestamps, samples))
+                    timestamps = []
+                    samples = []
+        except Exception as e:
+            self.error = e
+        finally:
+            if samples:
+                self._stop_event.set()
+                self._put((timestamps, samples))
+
+
+class MIXADS8568SGScheduler(object):
+    '''
+    MIXADS8568SGScheduler starts conversions on a fixed grid of absolute perf_counter_ns deadlines.
+
+    The k-th deadline is start + k / rate, so a late sample does not shift the following ones and the
+    spacing does not drift. When a conversion starts one period or more after its deadline, the deadline
+    is missed: 'skip' drops the missed grid slots and continues on the next grid slot which is still
+    ahead, every dropped slot is a missed deadline; 'catch_up' converts the late slots back to back
+    until it is on time again, every late conversion is a missed deadline. The lateness of every
+    conversion start is kept for jitter statistics.
+
+    Args:
+        ads8568:     instance(MIXADS8568SG), driver to acquire from.
+        channels:    list, [1~8], list of channel of every sample.
+        rate:        float, unit Hz, sample rate.
+        overrun:     string, ['skip', 'catch_up'], what to do with missed deadlines.
+
+    Examples:
+        scheduler = MIXADS8568SGScheduler(ads8568, [1, 2, 3, 4], 1000)
+        timestamps, samples = scheduler.run(1000)
+        report = scheduler.report()
+
+    '''
+
+    def __init__(self, ads8568, channels, rate, overrun='skip'):
+        assert isinstance(channels, list) and len(channels) > 0
+        for ch in channels:
+            assert ch in MIXADS8568SGDef.CHANNEL
+        assert rate > 0
+        assert overrun in MIXADS8568SGDef.OVERRUN_POLICY
+
+        self.ads8568 = ads8568
+        self.channels = list(channels)
+        self.rate = rate
+        self.overrun = overrun
+        self.missed = 0
+        # Lateness of every conversion start from its deadline, unit ns.
+        self.lateness = array('q')
+        self.timestamps = array('q')
+
+    def run(self, n_samples):
+        '''
+        Acquire n_samples samples on the deadline grid.
+
+        Args:
+            n_samples:    int, [0~], number of samples.
+
+        Returns:
+            (timestamps, samples), tuple, timestamps is array('q') of perf_counter_ns time of the
+                                   conversion starts, samples is the list of samples and one sample
+                                   is a list of volt values in the same order as channels.
+
+        '''
+        assert n_samples >= 0
+
+        ads8568 = self.ads8568
+        period = 1000000000.0 / self.rate
+        ch_pairs, slots = ads8568._setup_acquisition(self.channels)
+        slots = [(index, 0 if shift else 1) for index, shift in slots]
+        self.missed = 0
+        self.lateness = array('q')
+        self.timestamps = array('q')
+        samples = []
+        start = time.perf_counter_ns()
+        slot = 0
+        while len(samples) < n_samples:
+            deadline = start + int(slot * period)
+            late = time.perf_counter_ns() - deadline
+            if late >= period:
+                if 'skip' == self.overrun:
+                    # Move to the next grid slot which is still ahead, the current slot is dropped as well.
+                    skipped = int(late // period) + 1
+                    self.missed += skipped
+                    slot += skipped
+                    deadline = start + int(slot * period)
+                else:
+                    self.missed += 1
+            remaining = deadline - time.perf_counter_ns()
+            if remaining > MIXADS8568SGDef.SLEEP_THRESHOLD_NS:
+                # Coarse sleep, then fine delay.
+                time.sleep((remaining - MIXADS8568SGDef.SLEEP_THRESHOLD_NS) / 1000000000.0)
+                remaining = deadline - time.perf_counter_ns()
+            precise_delay(remaining)
+
+            timestamp = time.perf_counter_ns()
+            pair_data = ads8568._conv_ch_pair(ch_pairs)
+            pair_volt = [ads8568._code_2_mvolt(code, ch_pair) for code, ch_pair in zip(pair_data, ch_pairs)]
+            samples.append([pair_volt[index][half] for index, half in slots])
+            self.timestamps.append(timestamp)
+            self.lateness.append(timestamp - deadline)
+            slot += 1
+        return self.timestamps, samples
+
+    def report(self):
+        '''
+        Statistics of the last run.
+
+        Returns:
+            dict, 'samples', 'rate': achieved rate in Hz, 'missed': number of missed deadlines,
+                  'jitter_ns': dict of lateness percentiles 'p50', 'p90', 'p99' and 'max' in ns.
+
+        '''
+        timestamps = self.timestamps
+        n = len(timestamps)
+        rate = 0.0
+        if n > 1 and timestamps[-1] > timestamps[0]:
+            rate = (n - 1) * 1000000000.0 / (timestamps[-1] - timestamps[0])
+        lateness = sorted(self.lateness)
+        jitter = {}
+        if lateness:
+            for percentile in MIXADS8568SGDef.JITTER_PERCENTILES:
+                # Nearest-rank percentile.
+                jitter['p%d' % percentile] = lateness[max(0, int(math.ceil(percentile / 100.0 * n)) - 1)]
+            jitter['max'] = lateness[-1]
+        return {'samples': n, 'rate': rate, 'missed': self.missed, 'jitter_ns': jitter}
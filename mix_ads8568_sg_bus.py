@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+import os
+import mmap
+import threading
+from abc import ABC
+from abc import abstractmethod
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+class MIXADS8568SGPostedWriteBusDef:
+    # Writes to these registers trigger an action, they are never merged or delayed.
+    VOLATILE_REGISTERS = [MIXADS8568SGDef.SPI_NORMAL_DATA]
+    WIDTH_8BIT = 1  # byte
+    WIDTH_32BIT = 4  # byte
+
+
+class MIXADS8568SGMmapBusDef:
+    # Size of the ipcore register window, byte.
+    REG_SIZE = 256
+    WORD_SIZE = 4  # byte
+
+
+class MIXADS8568SGRegisterBackend(ABC):
+    '''
+    MIXADS8568SGRegisterBackend is the register access interface MIXADS8568SG uses, AXI4LiteBus is the
+    default implementation and any object with these four methods can be passed as axi4_bus.
+    Backends of this module subclass it, so a missing method fails at construction.
+
+    Reads may return any sequence of int, e.g. a memoryview; MIXADS8568SG only indexes it while it
+    holds bus_lock, so a backend may return a live view instead of a copy.
+
+    '''
+
+    @abstractmethod
+    def read_8bit_inc(self, addr, rd_len):
+        '''
+        Read rd_len 8bit registers from addr with incrementing address.
+
+        '''
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_8bit_inc(self, addr, data):
+        '''
+        Write 8bit registers from addr with incrementing address, one byte of data per register.
+
+        '''
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_32bit_inc(self, addr, rd_len):
+        '''
+        Read rd_len 32bit registers from addr with incrementing address.
+
+        '''
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_32bit_inc(self, addr, data):
+        '''
+        Write 32bit registers from addr with incrementing address, one word of data per register.
+
+        '''
+        raise NotImplementedError
+
+
+class MIXADS8568SGMmapBus(MIXADS8568SGRegisterBackend):
+    '''
+    MIXADS8568SGMmapBus accesses the ipcore registers through a memory mapping of its register window.
+
+    The window is a device node of the ipcore (e.g. a UIO device), a regular file, or any writable
+    buffer such as multiprocessing.shared_memory.SharedMemory.buf standing in for it. 32bit reads
+    return a zero-copy memoryview of the words, so reading channel data costs no driver call and no
+    list. Every register is accessed with its own width, writes are done one register at a time.
+
+    Args:
+        target:    string/buffer, path to map, or a writable buffer of the register window.
+        size:      int, byte, size of the register window.
+        offset:    int, byte, offset of the window in the file, a multiple of mmap.ALLOCATIONGRANULARITY.
+
+    Examples:
+        axi4_bus = MIXADS8568SGMmapBus('/dev/uio0')
+        ads8568 = MIXADS8568SG(axi4_bus, ...)
+
+    '''
+
+    def __init__(self, target, size=MIXADS8568SGMmapBusDef.REG_SIZE, offset=0):
+        assert size > 0 and size % MIXADS8568SGMmapBusDef.WORD_SIZE == 0
+
+        self._mmap = None
+        if isinstance(target, str):
+            fd = os.open(target, os.O_RDWR | getattr(os, 'O_SYNC', 0))
+            try:
+                self._mmap = mmap.mmap(fd, size, offset=offset)
+            finally:
+                os.close(fd)
+            target = self._mmap
+        self._bytes = memoryview(target)[:size]
+        assert len(self._bytes) == size and not self._bytes.readonly
+        self._words = self._bytes.cast('I')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def read_8bit_inc(self, addr, rd_len):
+        '''
+        Read 8bit registers from addr with incrementing address.
+
+        Returns:
+            memoryview, zero-copy view of the registers.
+
+        '''
+        return self._bytes[addr:addr + rd_len]
+
+    def write_8bit_inc(self, addr, data):
+        for value in data:
+            self._bytes[addr] = value
+            addr += 1
+
+    def read_32bit_inc(self, addr, rd_len):
+        '''
+        Read 32bit registers from addr with incrementing address.
+
+        Returns:
+            memoryview, zero-copy view of the registers.
+
+        '''
+        assert addr % MIXADS8568SGMmapBusDef.WORD_SIZE == 0
+
+        index = addr // MIXADS8568SGMmapBusDef.WORD_SIZE
+        return self._words[index:index + rd_len]
+
+    def write_32bit_inc(self, addr, data):
+        assert addr % MIXADS8568SGMmapBusDef.WORD_SIZE == 0
+
+        index = addr // MIXADS8568SGMmapBusDef.WORD_SIZE
+        for value in data:
+            self._words[index] = value
+            index += 1
+
+    def close(self):
+        '''
+        Release the views and unmap the window if it was mapped here. Views returned before must be released.
+
+        '''
+        if self._bytes is None:
+            return
+        self._words.release()
+        self._bytes.release()
+        self._words = None
+        self._bytes = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class MIXADS8568SGPostedWriteBus(MIXADS8568SGRegisterBackend):
+    '''
+    MIXADS8568SGPostedWriteBus queues posted register writes in front of AXI4LiteBus.
+
+    Writes are kept per register, a later write to the same register replaces the queued one. On flush
+    the queued registers are written in address order, every run of contiguous registers of the same
+    width is one write_8bit_inc or write_32bit_inc call. The queue is flushed before any read, and
+    writes to volatile registers flush the queue and go to the bus at once. MIXADS8568SG flushes it
+    before every conversion start.
+
+    Args:
+        axi4_bus:              instance(AXI4LiteBus), bus to write to.
+        volatile_registers:    list/None, register addresses which are never queued, None means
+                               MIXADS8568SGPostedWriteBusDef.VOLATILE_REGISTERS.
+
+    Examples:
+        axi4_bus = MIXADS8568SGPostedWriteBus(AXI4LiteBus('/dev/MIX_ADS8568_SG_0', 256))
+        ads8568 = MIXADS8568SG(axi4_bus, ...)
+        ads8568.init_dev('sw')
+        ads8568.set_spi_speed(10000000)
+        axi4_bus.flush()
+
+    '''
+
+    def __init__(self, axi4_bus, volatile_registers=None):
+        self.axi4_bus = axi4_bus
+        if volatile_registers is None:
+            volatile_registers = MIXADS8568SGPostedWriteBusDef.VOLATILE_REGISTERS
+        self.volatile_registers = set(volatile_registers)
+        # Queued register writes, address: (width, value).
+        self._pending = {}
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        # Other bus api go to the bus after the queue is flushed.
+        attr = getattr(self.axi4_bus, name)
+        if not callable(attr):
+            return attr
+
+        def flushed_call(*args, **kwargs):
+            self.flush()
+            return attr(*args, **kwargs)
+        return flushed_call
+
+    def pending(self):
+        '''
+        Returns:
+            int, number of queued register writes.
+
+        '''
+        return len(self._pending)
+
+    def _post(self, addr, width, data):
+        with self._lock:
+            if addr in self.volatile_registers:
+                self.flush()
+                self._write_run(addr, width, list(data))
+                return
+            for value in data:
+                self._pending[addr] = (width, value)
+                addr += width
+
+    def write_8bit_inc(self, addr, data):
+        '''
+        Queue 8bit register writes from addr with incrementing address.
+
+        Args:
+            addr:    int, register address.
+            data:    list, data to write, one byte per register.
+
+        '''
+        self._post(addr, MIXADS8568SGPostedWriteBusDef.WIDTH_8BIT, data)
+
+    def write_32bit_inc(self, addr, data):
+        '''
+        Queue 32bit register writes from addr with incrementing address.
+
+        Args:
+            addr:    int, register address.
+            data:    list, data to write, one 32bit word per register.
+
+        '''
+        self._post(addr, MIXADS8568SGPostedWriteBusDef.WIDTH_32BIT, data)
+
+    def read_8bit_inc(self, addr, rd_len):
+        '''
+        Flush queued writes, then read 8bit registers from addr with incrementing address.
+
+        '''
+        self.flush()
+        return self.axi4_bus.read_8bit_inc(addr, rd_len)
+
+    def read_32bit_inc(self, addr, rd_len):
+        '''
+        Flush queued writes, then read 32bit registers from addr with incrementing address.
+
+        '''
+        self.flush()
+        return self.axi4_bus.read_32bit_inc(addr, rd_len)
+
+    def flush(self):
+        '''
+        Write all queued registers in address order, merging contiguous registers of the same width.
+
+        Returns:
+            int, number of bus write calls.
+
+        Examples:
+            axi4_bus.flush()
+
+        '''
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending = self._pending
+            self._pending = {}
+            calls = 0
+            run_addr = None
+            run_width = None
+            run_data = []
+            for addr in sorted(pending):
+                width, value = pending[addr]
+                if run_data and width == run_width and addr == run_addr + len(run_data) * width:
+                    run_data.append(value)
+                    continue
+                if run_data:
+                    self._write_run(run_addr, run_width, run_data)
+                    calls += 1
+                run_addr, run_width, run_data = addr, width, [value]
+            self._write_run(run_addr, run_width, run_data)
+            return calls + 1
+
+    def _write_run(self, addr, width, data):
+        if MIXADS8568SGPostedWriteBusDef.WIDTH_8BIT == width:
+            self.axi4_bus.write_8bit_inc(addr, data)
+        else:
+            self.axi4_bus.write_32bit_inc(addr, data)
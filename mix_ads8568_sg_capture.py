@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+import json
+import mmap
+import time
+import struct
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGException
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGCalibration
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+class MIXADS8568SGCaptureDef:
+    MAGIC = b'ADS8568C'
+    VERSION = 1
+    # magic, version, reserved, header size, record count, json length
+    HEADER_FORMAT = '<8sHHIQI'
+    COUNT_OFFSET = 16
+    HEADER_SIZE = 4096
+    # timestamp in ns, then one 32bit word per channel pair
+    TIMESTAMP_FORMAT = '<q'
+    WORD_FORMAT = 'I'
+    GROW_RECORDS = 65536
+
+
+class MIXADS8568SGCaptureWriter(object):
+    '''
+    MIXADS8568SGCaptureWriter appends raw channel pair data to a memory-mapped capture file.
+
+    File layout: a HEADER_SIZE byte header with the record count and a JSON description of the driver
+    configuration (input_volt_range, pair_volt_range, max_vref_range, dev_func_mode, CONFIG, calibration
+    and channel map), then
+    fixed-size records of an int64 perf_counter_ns timestamp and one uint32 word per channel pair,
+    as returned by read_single_ch_data. The file grows in steps of grow_records records and is cut
+    to the written size on close.
+
+    Args:
+        path:            string, capture file path, an existing file is overwritten.
+        ads8568:         instance(MIXADS8568SG), driver whose configuration is recorded and which
+                         capture() acquires from.
+        ch_pairs:        list, ['A', 'B', 'C', 'D'], channel pairs of every record.
+        grow_records:    int, number of records the file grows by when full.
+
+    Examples:
+        with MIXADS8568SGCaptureWriter('/tmp/run.cap', ads8568, ['A', 'B']) as writer:
+            writer.capture(100000)
+
+    '''
+
+    def __init__(self, path, ads8568, ch_pairs, grow_records=MIXADS8568SGCaptureDef.GROW_RECORDS):
+        assert isinstance(ch_pairs, list) and len(ch_pairs) > 0
+        for ch_pair in ch_pairs:
+            assert ch_pair in MIXADS8568SGDef.CHANNEL_PAIR
+        assert grow_records >= 1
+
+        self.path = path
+        self.ads8568 = ads8568
+        self.ch_pairs = list(ch_pairs)
+        self.grow_records = grow_records
+        self.count = 0
+        self.record_format = MIXADS8568SGCaptureDef.TIMESTAMP_FORMAT + \
+            MIXADS8568SGCaptureDef.WORD_FORMAT * len(ch_pairs)
+        self.record_size = struct.calcsize(self.record_format)
+
+        # Channel map: channel -> [index of pair in record, shift of half-word].
+        channel_map = {}
+        for ch, ch_pair in MIXADS8568SGDef.CHANNEL.items():
+            if ch_pair in self.ch_pairs:
+                channel_map[str(ch)] = [self.ch_pairs.index(ch_pair), 16 if ch % 2 else 0]
+        self.info = {
+            'ch_pairs': self.ch_pairs,
+            'channel_map': channel_map,
+            'input_volt_range': ads8568.input_volt_range,
+            'pair_volt_range': ads8568.pair_volt_range,
+            'max_vref_range': ads8568.max_vref_range,
+            'dev_func_mode': ads8568.dev_func_mode,
+            'config': ads8568.current_config_data,
+            'calibration': list(ads8568.calibration.coefficients),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        info = json.dumps(self.info, sort_keys=True).encode('utf-8')
+        header = struct.pack(MIXADS8568SGCaptureDef.HEADER_FORMAT, MIXADS8568SGCaptureDef.MAGIC,
+                             MIXADS8568SGCaptureDef.VERSION, 0, MIXADS8568SGCaptureDef.HEADER_SIZE, 0, len(info))
+        if len(header) + len(info) > MIXADS8568SGCaptureDef.HEADER_SIZE:
+            raise MIXADS8568SGException('capture header is too long')
+
+        self._file = open(path, 'w+b')
+        self._file.write(header + info)
+        self._capacity = 0
+        self._mmap = None
+        self._grow()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _grow(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._capacity += self.grow_records
+        self._file.truncate(MIXADS8568SGCaptureDef.HEADER_SIZE + self._capacity * self.record_size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+
+    def append(self, timestamp, pair_data):
+        '''
+        Append one record.
+
+        Args:
+            timestamp:    int, unit ns, perf_counter_ns time of the conversion.
+            pair_data:    list, [0x0 ~ 0xFFFFFFFF], data of every channel pair, in the order of ch_pairs.
+
+        '''
+        if self.count == self._capacity:
+            self._grow()
+        struct.pack_into(self.record_format, self._mmap,
+                         MIXADS8568SGCaptureDef.HEADER_SIZE + self.count * self.record_size, timestamp, *pair_data)
+        self.count += 1
+
+    def capture(self, n_samples):
+        '''
+        Acquire n_samples group conversions of ch_pairs from the driver into the file.
+
+        Args:
+            n_samples:    int, [0~], number of records.
+
+        '''
+        assert n_samples >= 0
+
+        ads8568 = self.ads8568
+        ads8568._sel_ch_pair(self.ch_pairs)
+        for i in range(n_samples):
+            timestamp = time.perf_counter_ns()
+            self.append(timestamp, ads8568._conv_ch_pair(self.ch_pairs))
+
+    def flush(self):
+        '''
+        Write the record count to the header and flush the mapping to the file.
+
+        '''
+        struct.pack_into('<Q', self._mmap, MIXADS8568SGCaptureDef.COUNT_OFFSET, self.count)
+        self._mmap.flush()
+
+    def close(self):
+        '''
+        Flush, cut the file to the written records and close it.
+
+        '''
+        if self._file is None:
+            return
+        self.flush()
+        self._mmap.close()
+        self._mmap = None
+        self._file.truncate(MIXADS8568SGCaptureDef.HEADER_SIZE + self.count * self.record_size)
+        self._file.close()
+        self._file = None
+
+
+class MIXADS8568SGCaptureReader(object):
+    '''
+    MIXADS8568SGCaptureReader opens a capture file without loading it.
+
+    The file is memory-mapped read-only, timestamps and pair data are zero-copy NumPy views and volt
+    values are converted only for the requested slice. Views must be released before close().
+
+    Args:
+        path:    string, capture file path.
+
+    Examples:
+        with MIXADS8568SGCaptureReader('/tmp/run.cap') as reader:
+            volts = reader.volts(1, 0, 1000)
+
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, reserved, header_size, count, info_len = struct.unpack_from(
+            MIXADS8568SGCaptureDef.HEADER_FORMAT, self._mmap, 0)
+        if magic != MIXADS8568SGCaptureDef.MAGIC or version != MIXADS8568SGCaptureDef.VERSION:
+            self.close()
+            raise MIXADS8568SGException('%s is not a capture file of version %d' %
+                                        (path, MIXADS8568SGCaptureDef.VERSION))
+        info_offset = struct.calcsize(MIXADS8568SGCaptureDef.HEADER_FORMAT)
+        self.info = json.loads(self._mmap[info_offset:info_offset + info_len].decode('utf-8'))
+        self.header_size = header_size
+        self.ch_pairs = self.info['ch_pairs']
+        self.channel_map = dict((int(ch), tuple(slot)) for ch, slot in self.info['channel_map'].items())
+        self.input_volt_range = self.info['input_volt_range']
+        self.pair_volt_range = self.info['pair_volt_range']
+        self.calibration = MIXADS8568SGCalibration(self.info.get('calibration'))
+        self.record_format = MIXADS8568SGCaptureDef.TIMESTAMP_FORMAT + \
+            MIXADS8568SGCaptureDef.WORD_FORMAT * len(self.ch_pairs)
+        self.record_size = struct.calcsize(self.record_format)
+        # A writer which was not closed may leave preallocated records after the counted ones.
+        self.count = min(count, (len(self._mmap) - header_size) // self.record_size)
+        self._records = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        '''
+        Read one record without NumPy.
+
+        Args:
+            index:    int, [0 ~ count-1], record index.
+
+        Returns:
+            (timestamp, pair_data), tuple, pair_data is a tuple of words in the order of ch_pairs.
+
+        '''
+        assert 0 <= index < self.count
+        values = struct.unpack_from(self.record_format, self._mmap, self.header_size + index * self.record_size)
+        return values[0], values[1:]
+
+    @property
+    def records(self):
+        '''
+        Zero-copy NumPy structured view of all records, fields 'timestamp' and 'data'.
+
+        '''
+        assert np is not None, 'NumPy is needed for array views'
+        if self._records is None:
+            dtype = np.dtype([('timestamp', '<i8'), ('data', '<u4', (len(self.ch_pairs),))])
+            self._records = np.frombuffer(self._mmap, dtype, self.count, self.header_size)
+        return self._records
+
+    @property
+    def timestamps(self):
+        '''
+        Zero-copy NumPy view of the timestamps in ns.
+
+        '''
+        return self.records['timestamp']
+
+    def pair_data(self, ch_pair):
+        '''
+        Zero-copy NumPy view of the words of one channel pair.
+
+        Args:
+            ch_pair:    string, ['A', 'B', 'C', 'D'], channel pair in the file.
+
+        '''
+        assert ch_pair in self.ch_pairs
+        return self.records['data'][:, self.ch_pairs.index(ch_pair)]
+
+    def codes(self, ch, start=0, stop=None):
+        '''
+        Signed codes of one channel for records [start, stop).
+
+        Args:
+            ch:       int, [1~8], channel in the file.
+            start:    int, first record.
+            stop:     int/None, end record, None means the last record.
+
+        Returns:
+            numpy.ndarray of int16.
+
+        '''
+        assert ch in self.channel_map
+        index, shift = self.channel_map[ch]
+        words = self.records['data'][start:stop, index]
+        return ((words >> shift) & 0x0000FFFF).astype(np.uint16).view(np.int16)
+
+    def volts(self, ch, start=0, stop=None):
+        '''
+        Volt values of one channel for records [start, stop), converted only for this slice, with the
+        calibration recorded in the header.
+
+        Args:
+            ch:       int, [1~8], channel in the file.
+            start:    int, first record.
+            stop:     int/None, end record, None means the last record.
+
+        Returns:
+            numpy.ndarray of float64.
+
+        '''
+        volt_range = self.pair_volt_range[MIXADS8568SGDef.CHANNEL[ch]]
+        gain, offset = self.calibration.get(ch)
+        return self.codes(ch, start, stop) * (volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE * gain) + offset
+
+    def close(self):
+        '''
+        Close the file, views returned before are released first.
+
+        '''
+        self._records = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+class MIXADS8568SGOrchestratorDef:
+    # Fields of one scan result: device index, channel, perf_counter_ns time of conversion start, volt.
+    RESULT_DTYPE = [('device', 'i4'), ('channel', 'i1'), ('timestamp', 'i8'), ('value', 'f8')]
+
+
+class MIXADS8568SGOrchestrator(object):
+    '''
+    MIXADS8568SGOrchestrator scans several MIXADS8568SG devices, in parallel across AXI buses.
+
+    Devices are grouped by their AXI4LiteBus. Every group is scanned on its own worker thread, devices
+    of one group are scanned one after another, so the total scan time scales with the number of buses.
+
+    Args:
+        devices:        list, list of MIXADS8568SG instance, device index in the result is the list index.
+        bus_key:        function/None, returns the bus group key of a device, None means the
+                        innermost bus under the axi4_bus wrappers of the device.
+        max_workers:    int/None, number of worker threads, None means one per bus group.
+
+    Examples:
+        orchestrator = MIXADS8568SGOrchestrator([adc0, adc1, adc2])
+        result = orchestrator.scan([1, 2, 3, 4])
+        print(result['value'][result['device'] == 1])
+        orchestrator.close()
+
+    '''
+
+    def __init__(self, devices, bus_key=None, max_workers=None):
+        assert isinstance(devices, list) and len(devices) > 0
+
+        self.devices = list(devices)
+        bus_key = bus_key or (lambda device: id(self._innermost_bus(device.axi4_bus)))
+        groups = {}
+        for index, device in enumerate(self.devices):
+            groups.setdefault(bus_key(device), []).append(index)
+        # Group order follows the first device of every group, so results are stable.
+        self.groups = sorted(groups.values())
+        self._group_locks = [threading.Lock() for group in self.groups]
+        self._executor = ThreadPoolExecutor(max_workers or len(self.groups))
+
+    def _innermost_bus(self, axi4_bus):
+        # Stats and posted-write wrappers keep the wrapped bus in their own axi4_bus attribute.
+        while 'axi4_bus' in getattr(axi4_bus, '__dict__', {}):
+            axi4_bus = axi4_bus.__dict__['axi4_bus']
+        return axi4_bus
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        '''
+        Shut down the worker threads.
+
+        '''
+        self._executor.shutdown(wait=True)
+
+    def scan(self, ch_list):
+        '''
+        Scan channels of every device.
+
+        Args:
+            ch_list:    list/dict, [1~8], list of channel scanned on every device, or dict of
+                        device index to its list of channel, devices not in dict are skipped.
+
+        Returns:
+            numpy structured array with fields device, channel, timestamp and value, ordered by device
+            and then channel order, list of (device, channel, timestamp, value) tuple when NumPy is
+            not installed.
+
+        Examples:
+            result = orchestrator.scan({0: [1, 2], 2: [5, 6, 7, 8]})
+
+        '''
+        if isinstance(ch_list, dict):
+            device_ch = ch_list
+        else:
+            device_ch = dict((index, ch_list) for index in range(len(self.devices)))
+        for index, channels in device_ch.items():
+            assert 0 <= index < len(self.devices)
+            assert isinstance(channels, list) and len(channels) > 0
+            for ch in channels:
+                assert ch in MIXADS8568SGDef.CHANNEL
+
+        futures = []
+        for group, lock in zip(self.groups, self._group_locks):
+            indexes = [index for index in group if index in device_ch]
+            if indexes:
+                futures.append(self._executor.submit(self._scan_group, lock, indexes, device_ch))
+
+        rows = []
+        for future in futures:
+            rows.extend(future.result())
+        rows.sort(key=lambda row: row[0])
+        if np is not None:
+            return np.array(rows, dtype=MIXADS8568SGOrchestratorDef.RESULT_DTYPE)
+        return rows
+
+    def _scan_group(self, lock, indexes, device_ch):
+        rows = []
+        # Access within one bus is serialized.
+        with lock:
+            for index in indexes:
+                device = self.devices[index]
+                channels = device_ch[index]
+                with device.bus_lock:
+                    ch_pairs, slots = device._setup_acquisition(channels)
+                    timestamp = time.perf_counter_ns()
+                    pair_data = device._conv_ch_pair(ch_pairs)
+                pair_volt = [device._code_2_mvolt(code, ch_pair) for code, ch_pair in zip(pair_data, ch_pairs)]
+                for ch, (pair_index, shift) in zip(channels, slots):
+                    rows.append((index, ch, timestamp, pair_volt[pair_index][0 if shift else 1]))
+        return rows
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import struct
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGException
+
+try:
+    from multiprocessing import shared_memory
+    from multiprocessing import resource_tracker
+except ImportError:
+    shared_memory = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+class MIXADS8568SGShmDef:
+    MAGIC = b'ADS8568R'
+    VERSION = 1
+    # magic, version, flags, header size, capacity, json length, write sequence
+    HEADER_FORMAT = '<8sHHIIIQ'
+    FLAGS_OFFSET = 10
+    SEQ_OFFSET = 24
+    HEADER_SIZE = 4096
+    # Set by the producer when it is closed.
+    FLAG_CLOSED = 0x0001
+    # timestamp in ns, then one 32bit word per channel pair
+    TIMESTAMP_FORMAT = '<q'
+    WORD_FORMAT = 'I'
+    CAPACITY = 65536
+
+
+def _attach(name):
+    # Returns the shared memory and whether attaching registered it at the resource tracker. Python 3.13
+    # has track=False, older versions always register on attach.
+    try:
+        return shared_memory.SharedMemory(name, track=False), False
+    except TypeError:
+        return shared_memory.SharedMemory(name), True
+
+
+def _tracker_id():
+    # Processes started by multiprocessing share the resource tracker of their parent, its pipe identifies it.
+    if 'posix' != os.name:
+        return None
+    stat = os.fstat(resource_tracker.getfd())
+    return [stat.st_dev, stat.st_ino]
+
+
+class MIXADS8568SGShmProducer(object):
+    '''
+    MIXADS8568SGShmProducer acquires raw channel pair data into a shared memory ring for other processes.
+
+    The ring is a multiprocessing.shared_memory block: a HEADER_SIZE byte header with the write
+    sequence and a JSON description of the driver configuration, then capacity records of an int64
+    perf_counter_ns timestamp and one uint32 word per channel pair. Record n is stored in slot
+    n % capacity and the write sequence, the number of records written, is updated after the record,
+    so consumers never see a record before it is complete. Consumers attach by name with
+    MIXADS8568SGShmConsumer, nothing is pickled.
+
+    Args:
+        ads8568:     instance(MIXADS8568SG), driver to acquire from.
+        ch_pairs:    list, ['A', 'B', 'C', 'D'], channel pairs of every record.
+        capacity:    int, [1~], number of records in the ring.
+        name:        string/None, shared memory name, None means a generated one.
+
+    Examples:
+        producer = MIXADS8568SGShmProducer(ads8568, ['A', 'B'])
+        # in the analysis process: MIXADS8568SGShmConsumer(producer.name)
+        producer.capture(1000000)
+        producer.close()
+        producer.unlink()
+
+    '''
+
+    def __init__(self, ads8568, ch_pairs, capacity=MIXADS8568SGShmDef.CAPACITY, name=None):
+        assert shared_memory is not None, 'multiprocessing.shared_memory is needed'
+        assert isinstance(ch_pairs, list) and len(ch_pairs) > 0
+        for ch_pair in ch_pairs:
+            assert ch_pair in MIXADS8568SGDef.CHANNEL_PAIR
+        assert capacity >= 1
+
+        self.ads8568 = ads8568
+        self.ch_pairs = list(ch_pairs)
+        self.capacity = capacity
+        self.seq = 0
+        self.record_format = MIXADS8568SGShmDef.TIMESTAMP_FORMAT + MIXADS8568SGShmDef.WORD_FORMAT * len(ch_pairs)
+        self.record_size = struct.calcsize(self.record_format)
+
+        # Channel map: channel -> [index of pair in record, shift of half-word].
+        channel_map = {}
+        for ch, ch_pair in MIXADS8568SGDef.CHANNEL.items():
+            if ch_pair in self.ch_pairs:
+                channel_map[str(ch)] = [self.ch_pairs.index(ch_pair), 16 if ch % 2 else 0]
+        self.info = {
+            'ch_pairs': self.ch_pairs,
+            'channel_map': channel_map,
+            'pair_volt_range': ads8568.pair_volt_range,
+            'calibration': list(ads8568.calibration.coefficients),
+            'resource_tracker': _tracker_id(),
+        }
+        info = json.dumps(self.info, sort_keys=True).encode('utf-8')
+        header = struct.pack(MIXADS8568SGShmDef.HEADER_FORMAT, MIXADS8568SGShmDef.MAGIC, MIXADS8568SGShmDef.VERSION,
+                             0, MIXADS8568SGShmDef.HEADER_SIZE, capacity, len(info), 0)
+        if len(header) + len(info) > MIXADS8568SGShmDef.HEADER_SIZE:
+            raise MIXADS8568SGException('shared memory header is too long')
+
+        self._shm = shared_memory.SharedMemory(name, create=True,
+                                               size=MIXADS8568SGShmDef.HEADER_SIZE + capacity * self.record_size)
+        self.name = self._shm.name
+        self._buf = self._shm.buf
+        self._buf[:len(header) + len(info)] = header + info
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.unlink()
+        return False
+
+    def append(self, timestamp, pair_data):
+        '''
+        Append one record and publish it.
+
+        Args:
+            timestamp:    int, unit ns, perf_counter_ns time of the conversion.
+            pair_data:    list, [0x0 ~ 0xFFFFFFFF], data of every channel pair, in the order of ch_pairs.
+
+        '''
+        struct.pack_into(self.record_format, self._buf,
+                         MIXADS8568SGShmDef.HEADER_SIZE + (self.seq % self.capacity) * self.record_size,
+                         timestamp, *pair_data)
+        self.seq += 1
+        struct.pack_into('<Q', self._buf, MIXADS8568SGShmDef.SEQ_OFFSET, self.seq)
+
+    def capture(self, n_samples=None, stop_event=None):
+        '''
+        Acquire group conversions of ch_pairs from the driver into the ring.
+
+        Args:
+            n_samples:     int/None, [0~], number of records, None means until stop_event is set.
+            stop_event:    instance/None, threading.Event or multiprocessing.Event which stops the capture.
+
+        '''
+        assert n_samples is None or n_samples >= 0
+        assert n_samples is not None or stop_event is not None
+
+        ads8568 = self.ads8568
+        ads8568._sel_ch_pair(self.ch_pairs)
+        count = 0
+        while n_samples is None or count < n_samples:
+            if stop_event is not None and stop_event.is_set():
+                break
+            timestamp = time.perf_counter_ns()
+            self.append(timestamp, ads8568._conv_ch_pair(self.ch_pairs))
+            count += 1
+
+    def close(self):
+        '''
+        Mark the ring closed for consumers and detach from it.
+
+        '''
+        if self._buf is None:
+            return
+        struct.pack_into('<H', self._buf, MIXADS8568SGShmDef.FLAGS_OFFSET, MIXADS8568SGShmDef.FLAG_CLOSED)
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self):
+        '''
+        Destroy the shared memory, after consumers detached.
+
+        '''
+        self._shm.unlink()
+
+
+class MIXADS8568SGShmConsumer(object):
+    '''
+    MIXADS8568SGShmConsumer reads the ring of a MIXADS8568SGShmProducer from any process.
+
+    Every consumer keeps its own read sequence. read() returns the records written since the last
+    read as zero-copy NumPy views into the ring; a view is valid until the producer wraps around and
+    overwrites it, which overwritten() tells. At most capacity - 1 records are kept for a consumer, as
+    the producer writes the next slot in place; when the consumer falls further behind, the oldest
+    records are skipped and counted in lost.
+
+    Args:
+        name:    string, shared memory name of the producer.
+
+    Examples:
+        consumer = MIXADS8568SGShmConsumer(name)
+        while not consumer.finished():
+            seq, timestamps, data = consumer.read()
+            volts = consumer.volts(1, data)
+        consumer.close()
+
+    '''
+
+    def __init__(self, name):
+        assert shared_memory is not None, 'multiprocessing.shared_memory is needed'
+
+        self._shm, tracked = _attach(name)
+        self.name = name
+        self._buf = self._shm.buf
+        magic, version, flags, header_size, capacity, info_len, seq = struct.unpack_from(
+            MIXADS8568SGShmDef.HEADER_FORMAT, self._buf, 0)
+        if magic != MIXADS8568SGShmDef.MAGIC or version != MIXADS8568SGShmDef.VERSION:
+            self.close()
+            raise MIXADS8568SGException('%s is not a sample ring of version %d' % (name, MIXADS8568SGShmDef.VERSION))
+        info_offset = struct.calcsize(MIXADS8568SGShmDef.HEADER_FORMAT)
+        self.info = json.loads(bytes(self._buf[info_offset:info_offset + info_len]).decode('utf-8'))
+        self.header_size = header_size
+        self.capacity = capacity
+        self.ch_pairs = self.info['ch_pairs']
+        self.channel_map = dict((int(ch), tuple(slot)) for ch, slot in self.info['channel_map'].items())
+        self.pair_volt_range = self.info['pair_volt_range']
+        self.calibration = self.info['calibration']
+        # A registration at a tracker of its own would unlink the producer's memory when this process exits,
+        # while the producer's registration at a shared tracker must be kept.
+        if tracked and self.info['resource_tracker'] != _tracker_id():
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self.record_format = MIXADS8568SGShmDef.TIMESTAMP_FORMAT + \
+            MIXADS8568SGShmDef.WORD_FORMAT * len(self.ch_pairs)
+        self.record_size = struct.calcsize(self.record_format)
+        # Next record to read, new consumers start at the oldest record still in the ring.
+        self.seq = max(0, seq - capacity + 1)
+        self.lost = 0
+        self._records = None
+        if np is not None:
+            dtype = np.dtype([('timestamp', '<i8'), ('data', '<u4', (len(self.ch_pairs),))])
+            self._records = np.frombuffer(self._buf, dtype, capacity, header_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def write_seq(self):
+        '''
+        Returns:
+            int, number of records the producer has written.
+
+        '''
+        return struct.unpack_from('<Q', self._buf, MIXADS8568SGShmDef.SEQ_OFFSET)[0]
+
+    def finished(self):
+        '''
+        Returns:
+            bool, True when the producer is closed and every record was read.
+
+        '''
+        flags = struct.unpack_from('<H', self._buf, MIXADS8568SGShmDef.FLAGS_OFFSET)[0]
+        return bool(flags & MIXADS8568SGShmDef.FLAG_CLOSED) and self.seq >= self.write_seq()
+
+    def overwritten(self, seq):
+        '''
+        Args:
+            seq:    int, sequence of a record, e.g. returned by read().
+
+        Returns:
+            bool, True when the producer has overwritten the record.
+
+        '''
+        # The slot of write_seq - capacity is the one the producer writes next.
+        return self.write_seq() - self.capacity >= seq
+
+    def read(self, max_records=None):
+        '''
+        Read the new records, up to the end of the ring; call again for records after the wrap-around.
+
+        Args:
+            max_records:    int/None, [1~], maximum number of records, None means all new ones.
+
+        Returns:
+            (seq, timestamps, data), tuple, seq is the sequence of the first record, timestamps is the
+                                     int64 view of perf_counter_ns times, data is the uint32 view of
+                                     shape (records, len(ch_pairs)). Without NumPy timestamps is a list
+                                     and data a list of tuples, copied from the ring.
+
+        '''
+        assert max_records is None or max_records >= 1
+
+        write_seq = self.write_seq()
+        # The producer may be writing the slot of write_seq - capacity, it is not returned.
+        oldest = write_seq - self.capacity + 1
+        if self.seq < oldest:
+            self.lost += oldest - self.seq
+            self.seq = oldest
+        start = self.seq
+        slot = start % self.capacity
+        count = min(write_seq - start, self.capacity - slot)
+        if max_records is not None:
+            count = min(count, max_records)
+        self.seq = start + count
+
+        if self._records is not None:
+            records = self._records[slot:slot + count]
+            return start, records['timestamp'], records['data']
+        timestamps = []
+        data = []
+        for i in range(count):
+            values = struct.unpack_from(self.record_format, self._buf,
+                                        self.header_size + (slot + i) * self.record_size)
+            timestamps.append(values[0])
+            data.append(values[1:])
+        return start, timestamps, data
+
+    def volts(self, ch, data):
+        '''
+        Convert the words of one channel in a block returned by read() to calibrated volt values.
+
+        Args:
+            ch:      int, [1~8], channel in the ring.
+            data:    numpy.ndarray/list, data of a block returned by read().
+
+        Returns:
+            numpy.ndarray of float64 when NumPy is installed, else list.
+
+        '''
+        assert ch in self.channel_map
+        index, shift = self.channel_map[ch]
+        lsb = self.pair_volt_range[MIXADS8568SGDef.CHANNEL[ch]] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+        gain = self.calibration[2 * (ch - 1)]
+        offset = self.calibration[2 * (ch - 1) + 1]
+        if np is not None:
+            codes = ((np.asarray(data)[:, index] >> shift) & 0x0000FFFF).astype(np.uint16).view(np.int16)
+            return codes * (lsb * gain) + offset
+        volts = []
+        for words in data:
+            code = (words[index] >> shift) & 0x0000FFFF
+            if code & MIXADS8568SGDef.SIGN_BIT:
+                code -= MIXADS8568SGDef.CODE_MODULUS
+            volts.append(code * lsb * gain + offset)
+        return volts
+
+    def close(self):
+        '''
+        Detach from the ring, views returned before are released first.
+
+        '''
+        if self._buf is None:
+            return
+        self._records = None
+        self._buf = None
+        self._shm.close()
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+import random
+import threading
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SG
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+class MIXADS8568SGSimDef:
+    # Pin names in the order of MIXADS8568SG arguments.
+    PINS = ['convst_a', 'convst_b', 'convst_c', 'convst_d', 'busy', 'xclk', 'hw_sw_sel', 'ref_sel',
+            'stby', 'reset', 'cs', 'refbuf_en', 'asleep_sel', 'ser_sel', 'sel_cd', 'sel_b']
+    CONVST_PAIR = {'convst_a': 'A', 'convst_b': 'B', 'convst_c': 'C', 'convst_d': 'D'}
+    PAIR_CHANNEL = {'A': (1, 2), 'B': (3, 4), 'C': (5, 6), 'D': (7, 8)}
+    # Conversion latency, unit s.
+    CONV_LATENCY = 0.0000015
+    CODE_MIN = -0x8000
+    CODE_MAX = 0x7FFF
+
+
+def sine_wave(amplitude, frequency, offset=0.0, phase=0.0):
+    '''
+    Create a sine input waveform.
+
+    Args:
+        amplitude:    float, unit V, peak amplitude.
+        frequency:    float, unit Hz, frequency.
+        offset:       float, unit V, DC offset.
+        phase:        float, unit rad, phase at t=0.
+
+    Returns:
+        function, volt value of time t in s.
+
+    Examples:
+        sim.set_input(1, sine_wave(1.0, 50))
+
+    '''
+    return lambda t: offset + amplitude * math.sin(2 * math.pi * frequency * t + phase)
+
+
+class MIXADS8568SGSimPin(object):
+    '''
+    MIXADS8568SGSimPin is a simulated GPIO pin with the api MIXADS8568SG uses.
+
+    Args:
+        name:         string, pin name.
+        on_change:    function/None, called with (name, level) when an output level changes.
+
+    '''
+
+    def __init__(self, name, on_change=None, level=0):
+        self.name = name
+        self.on_change = on_change
+        self.level = level
+        self.dir = 'input'
+        self.set_count = 0
+        self.get_count = 0
+        self.read_level = None
+
+    def set_dir(self, pin_dir):
+        assert pin_dir in ['input', 'output']
+        self.dir = pin_dir
+
+    def get_dir(self):
+        return self.dir
+
+    def set_level(self, level):
+        self.set_count += 1
+        level = 1 if level else 0
+        if level != self.level:
+            self.level = level
+            if self.on_change is not None:
+                self.on_change(self.name, level)
+
+    def get_level(self):
+        self.get_count += 1
+        if self.read_level is not None:
+            return self.read_level()
+        return self.level
+
+
+class MIXADS8568SGSimBus(object):
+    '''
+    MIXADS8568SGSimBus is the simulated AXI4-Lite register map of the MIXADS8568SG ipcore.
+
+    Every call is one transaction, counted in read_count and write_count. transaction_time models the
+    bus driver overhead of one call.
+
+    '''
+
+    def __init__(self, sim, transaction_time=0):
+        self._sim = sim
+        self.transaction_time = transaction_time
+        self.read_count = 0
+        self.write_count = 0
+        self.reg8 = {}
+        self.reg32 = {}
+
+    def _transaction(self):
+        if self.transaction_time:
+            deadline = time.perf_counter() + self.transaction_time
+            while time.perf_counter() < deadline:
+                pass
+
+    def write_8bit_inc(self, addr, data):
+        self._transaction()
+        self.write_count += 1
+        with self._sim.lock:
+            for i, value in enumerate(data):
+                self.reg8[addr + i] = int(value) & 0xFF
+
+    def read_8bit_inc(self, addr, rd_len):
+        self._transaction()
+        self.read_count += 1
+        return [self.reg8.get(addr + i, 0) for i in range(rd_len)]
+
+    def write_32bit_inc(self, addr, data):
+        self._transaction()
+        self.write_count += 1
+        with self._sim.lock:
+            for i, value in enumerate(data):
+                reg = addr + i * 4
+                value = int(value) & 0xFFFFFFFF
+                if MIXADS8568SGDef.SPI_NORMAL_DATA == reg:
+                    self._sim._spi_command(value)
+                else:
+                    self.reg32[reg] = value
+
+    def read_32bit_inc(self, addr, rd_len):
+        self._transaction()
+        self.read_count += 1
+        with self._sim.lock:
+            self._sim._update()
+            rd_data = []
+            for i in range(rd_len):
+                reg = addr + i * 4
+                if MIXADS8568SGDef.SPI_NORMAL_DATA == reg:
+                    rd_data.append(self._sim.spi_data)
+                elif reg in self._sim.pair_data:
+                    rd_data.append(self._sim.pair_data[reg])
+                    # Reading data clears INT in interrupt mode.
+                    self._sim.data_ready = False
+                else:
+                    rd_data.append(self.reg32.get(reg, 0))
+            return rd_data
+
+
+class MIXADS8568SGSim(object):
+    '''
+    MIXADS8568SGSim simulates the ADS8568 and MIXADS8568SG ipcore for hardware-free runs.
+
+    It provides a register map bus and GPIO pins that MIXADS8568SG runs against unmodified. A rising
+    CONVST edge samples the inputs of its channel pair and keeps BUSY active for conv_latency; the
+    result is in the CHANNEL_*_DATA register of the pair afterwards, if the ipcore is enabled
+    and the pair is selected (SEL_B for pair B, SEL_CD for pair C and D).
+
+    CONFIG model: a write to SPI_NORMAL_DATA with both WR_RD_CONFIG_REG bits set replaces CONFIG with
+    the other bits and makes the next SPI_NORMAL_DATA read return CONFIG, any other write is ignored.
+    Reset restores 0x000003FF.
+    Range, reference, BUSY/INT mode and polarity follow CONFIG in sw mode; in hw mode the range follows
+    the xclk pin and the reference is 2.5V.
+
+    Args:
+        conv_latency:        float, unit s, conversion time, BUSY is active for it.
+        transaction_time:    float, unit s, time of one bus call.
+        noise:               float, unit code, standard deviation of gaussian noise added to codes.
+        seed:                int, seed of the noise.
+
+    Examples:
+        sim = MIXADS8568SGSim()
+        sim.set_input(1, sine_wave(1.0, 50))
+        ads8568 = sim.create_driver()
+        ads8568.init_dev('hw')
+        ads8568.read_ch(1)
+
+    '''
+
+    def __init__(self, conv_latency=MIXADS8568SGSimDef.CONV_LATENCY, transaction_time=0, noise=0, seed=0):
+        self.lock = threading.RLock()
+        self.conv_latency = conv_latency
+        self.noise = noise
+        self._random = random.Random(seed)
+        self._t0 = time.perf_counter()
+        self.inputs = dict((ch, 0.0) for ch in MIXADS8568SGDef.CHANNEL)
+        self.config = MIXADS8568SGDef.CONFIG_DEFAULT
+        self.spi_data = 0
+        self.pair_data = dict((MIXADS8568SGDef.CHANNEL_PAIR[pair], 0) for pair in MIXADS8568SGDef.CHANNEL_PAIR)
+        self.conversion_count = 0
+        self.data_ready = False
+        # Pair: (end time, word) of ongoing conversions.
+        self._converting = {}
+
+        self.bus = MIXADS8568SGSimBus(self, transaction_time)
+        self.pins = dict((name, MIXADS8568SGSimPin(name, self._pin_change)) for name in MIXADS8568SGSimDef.PINS)
+        self.pins['busy'].read_level = self._busy_level
+
+    def create_driver(self, **kwargs):
+        '''
+        Create a MIXADS8568SG on the simulated bus and pins.
+
+        Args:
+            kwargs:    other keyword arguments of MIXADS8568SG, e.g. timing.
+
+        Returns:
+            MIXADS8568SG instance.
+
+        '''
+        pins = dict((name, self.pins[name]) for name in MIXADS8568SGSimDef.PINS)
+        pins.update(kwargs)
+        return MIXADS8568SG(self.bus, **pins)
+
+    def set_input(self, ch, waveform):
+        '''
+        Set the input of a channel.
+
+        Args:
+            ch:          int, [1~8], channel.
+            waveform:    float/function, unit V, constant volt or function of time t in s.
+
+        '''
+        assert ch in MIXADS8568SGDef.CHANNEL
+        self.inputs[ch] = waveform
+
+    def now(self):
+        '''
+        Returns:
+            float, unit s, simulation time.
+
+        '''
+        return time.perf_counter() - self._t0
+
+    def input_volt_range(self, pair):
+        '''
+        Returns:
+            float, unit V, input volt range of the channel pair in the current configuration.
+
+        '''
+        if self.pins['hw_sw_sel'].level == MIXADS8568SGDef.DEV_FUNC_MODE['hw']:
+            two_vref = self.pins['xclk'].level == MIXADS8568SGDef.HW_ABSOLUTE_VOLT_RANGE['2VREF']
+            vref = 2.5
+        else:
+            two_vref = bool(self.config & MIXADS8568SGDef.SW_ABSOLUTE_VOLT_RANGE[pair]['2VREF'])
+            vref = 3.0 if self.config & MIXADS8568SGDef.VREF_3000_MV else 2.5
+        return (2 if two_vref else 4) * vref
+
+    def _code(self, ch, t, volt_range):
+        waveform = self.inputs[ch]
+        volt = waveform(t) if callable(waveform) else waveform
+        code = volt / volt_range * MIXADS8568SGDef.POSITIVE_FULL_SCALE
+        if self.noise:
+            code += self._random.gauss(0, self.noise)
+        code = int(round(code))
+        code = max(MIXADS8568SGSimDef.CODE_MIN, min(MIXADS8568SGSimDef.CODE_MAX, code))
+        return code & 0xFFFF
+
+    def _pin_change(self, name, level):
+        with self.lock:
+            if name in MIXADS8568SGSimDef.CONVST_PAIR and level:
+                self._start_conversion(MIXADS8568SGSimDef.CONVST_PAIR[name])
+            elif 'reset' == name and level:
+                self.config = MIXADS8568SGDef.CONFIG_DEFAULT
+                self._converting.clear()
+                self.data_ready = False
+
+    def _start_conversion(self, pair):
+        self._update()
+        if pair in self._converting:
+            # Conversion start during an ongoing conversion of the pair is ignored.
+            return
+        t = self.now()
+        volt_range = self.input_volt_range(pair)
+        odd, even = MIXADS8568SGSimDef.PAIR_CHANNEL[pair]
+        word = (self._code(odd, t, volt_range) << 16) | self._code(even, t, volt_range)
+        self._converting[pair] = (t + self.conv_latency, word)
+        self.conversion_count += 1
+
+    def _selected(self, pair):
+        if 'B' == pair:
+            return self.bus.reg8.get(MIXADS8568SGDef.ADS8568_SEL_B, 0) == MIXADS8568SGDef.STATUS['enable']
+        if pair in ['C', 'D']:
+            return self.bus.reg8.get(MIXADS8568SGDef.ADS8568_SEL_CD, 0) == MIXADS8568SGDef.STATUS['enable']
+        return True
+
+    def _update(self):
+        # Finish conversions whose time is over.
+        if not self._converting:
+            return
+        t = self.now()
+        enabled = self.bus.reg8.get(MIXADS8568SGDef.MODULE_STATUS, 0) == MIXADS8568SGDef.STATUS['enable']
+        for pair in list(self._converting):
+            end, word = self._converting[pair]
+            if t >= end:
+                del self._converting[pair]
+                if enabled and self._selected(pair):
+                    self.pair_data[MIXADS8568SGDef.CHANNEL_PAIR[pair]] = word
+                self.data_ready = True
+
+    def _spi_command(self, value):
+        if (value & MIXADS8568SGDef.WR_RD_CONFIG_REG) == MIXADS8568SGDef.WR_RD_CONFIG_REG:
+            self.config = value & ~MIXADS8568SGDef.WR_RD_CONFIG_REG & MIXADS8568SGDef.CONFIG_MASK
+            self.spi_data = self.config
+
+    def _busy_level(self):
+        with self.lock:
+            self._update()
+            if self.config & MIXADS8568SGDef.INTERRUPT_MODE and \
+                    self.pins['hw_sw_sel'].level == MIXADS8568SGDef.DEV_FUNC_MODE['sw']:
+                active = self.data_ready and not self._converting
+            else:
+                active = bool(self._converting)
+            if self.config & MIXADS8568SGDef.ACTIVE_LOW and \
+                    self.pins['hw_sw_sel'].level == MIXADS8568SGDef.DEV_FUNC_MODE['sw']:
+                return 0 if active else 1
+            return 1 if active else 0
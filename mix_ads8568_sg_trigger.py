@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import deque
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+class MIXADS8568SGTriggerDef:
+    MODE = ['level', 'edge', 'window']
+    SLOPE = ['rising', 'falling', 'either']
+    WINDOW = ['outside', 'inside']
+    # Signed codes are compared as offset binary, code ^ SIGN_BIT, so the raw half-word needs no sign handling.
+    CODE_MIN = 0x0000
+    CODE_MAX = 0xFFFF
+
+
+class MIXADS8568SGTrigger(object):
+    '''
+    MIXADS8568SGTrigger is a trigger condition on one channel, evaluated on raw 16bit codes.
+
+    Modes:
+        level:     fires on every sample at or above level (rising) or at or below level (falling)
+                   while armed, so a capture is restarted as long as the condition holds.
+        edge:      fires when the signal crosses level in the slope direction.
+        window:    fires on every sample outside (or inside) [low, high] while armed.
+
+    Thresholds are given in volt and converted to codes once when the capture is armed, using the
+    channel pair range and the calibration of the driver.
+
+    Args:
+        ch:        int, [1~8], trigger channel.
+        mode:      string, ['level', 'edge', 'window'], trigger mode.
+        level:     float, unit V, threshold of level and edge mode.
+        slope:     string, ['rising', 'falling', 'either'], direction of level and edge mode,
+                   'either' is only for edge mode.
+        low:       float, unit V, lower bound of window mode.
+        high:      float, unit V, upper bound of window mode.
+        window:    string, ['outside', 'inside'], fire when the signal is outside or inside the window.
+
+    Examples:
+        trigger = MIXADS8568SGTrigger(3, 'edge', level=1.0, slope='falling')
+        trigger = MIXADS8568SGTrigger(1, 'window', low=-0.5, high=0.5)
+
+    '''
+
+    def __init__(self, ch, mode='edge', level=0.0, slope='rising', low=None, high=None, window='outside'):
+        assert ch in MIXADS8568SGDef.CHANNEL
+        assert mode in MIXADS8568SGTriggerDef.MODE
+        assert slope in MIXADS8568SGTriggerDef.SLOPE
+        assert window in MIXADS8568SGTriggerDef.WINDOW
+        assert not ('level' == mode and 'either' == slope)
+        assert 'window' != mode or (low is not None and high is not None and low <= high)
+
+        self.ch = ch
+        self.mode = mode
+        self.level = level
+        self.slope = slope
+        self.low = low
+        self.high = high
+        self.window = window
+        self._previous = None
+
+    def _volt_2_code(self, ads8568, volt):
+        lsb = ads8568.pair_volt_range[MIXADS8568SGDef.CHANNEL[self.ch]] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+        gain, offset = ads8568.calibration.get(self.ch)
+        code = int(round((volt - offset) / gain / lsb)) + MIXADS8568SGDef.SIGN_BIT
+        return max(MIXADS8568SGTriggerDef.CODE_MIN, min(MIXADS8568SGTriggerDef.CODE_MAX, code))
+
+    def arm(self, ads8568):
+        '''
+        Convert the thresholds to codes of the current range and calibration of ads8568 and forget
+        the previous sample.
+
+        Args:
+            ads8568:    instance(MIXADS8568SG), driver the codes come from.
+
+        '''
+        if 'window' == self.mode:
+            self._low = self._volt_2_code(ads8568, self.low)
+            self._high = self._volt_2_code(ads8568, self.high)
+        else:
+            self._level = self._volt_2_code(ads8568, self.level)
+        self._previous = None
+
+    def fire(self, code):
+        '''
+        Evaluate one sample.
+
+        Args:
+            code:    int, [0x0 ~ 0xFFFF], raw half-word of the trigger channel.
+
+        Returns:
+            bool, True when the trigger condition is met.
+
+        '''
+        value = code ^ MIXADS8568SGDef.SIGN_BIT
+        previous = self._previous
+        self._previous = value
+        if 'window' == self.mode:
+            return (self._low <= value <= self._high) == ('inside' == self.window)
+        if 'level' == self.mode:
+            return value >= self._level if 'rising' == self.slope else value <= self._level
+        if previous is None:
+            return False
+        if self.slope != 'falling' and previous < self._level <= value:
+            return True
+        return self.slope != 'rising' and previous > self._level >= value
+
+
+class MIXADS8568SGTriggeredCapture(object):
+    '''
+    MIXADS8568SGTriggeredCapture acquires continuously and only emits the windows around trigger events.
+
+    Conversions run back to back like MIXADS8568SG.stream. Raw pair data of the last pre_samples
+    conversions is kept in a ring, the trigger is evaluated on the raw code of every conversion and
+    only the samples of a captured window are converted to volt. The trigger is armed again after
+    a window is complete, so windows may share pre-trigger samples with the previous one.
+
+    Every event is (trigger_index, timestamps, samples): timestamps are perf_counter_ns of every
+    conversion start, samples are lists of volt values in the order of channels, and
+    timestamps[trigger_index] is the trigger sample. Fewer than pre_samples samples precede it when
+    the trigger fires before the ring is filled.
+
+    Args:
+        ads8568:         instance(MIXADS8568SG), driver to acquire from.
+        channels:        list, [1~8], list of channel of every sample, the trigger channel is
+                         converted even when it is not in the list.
+        trigger:         instance(MIXADS8568SGTrigger), trigger condition.
+        pre_samples:     int, [0~], samples kept before the trigger sample.
+        post_samples:    int, [0~], samples captured after the trigger sample.
+
+    Examples:
+        trigger = MIXADS8568SGTrigger(1, 'edge', level=0.5)
+        capture = MIXADS8568SGTriggeredCapture(ads8568, [1, 2], trigger, 100, 400)
+        for trigger_index, timestamps, samples in capture.run(n_events=10):
+            print(timestamps[trigger_index], samples[trigger_index])
+
+    '''
+
+    def __init__(self, ads8568, channels, trigger, pre_samples, post_samples):
+        assert isinstance(channels, list) and len(channels) > 0
+        for ch in channels:
+            assert ch in MIXADS8568SGDef.CHANNEL
+        assert isinstance(trigger, MIXADS8568SGTrigger)
+        assert pre_samples >= 0
+        assert post_samples >= 0
+
+        self.ads8568 = ads8568
+        self.channels = list(channels)
+        self.trigger = trigger
+        self.pre_samples = pre_samples
+        self.post_samples = post_samples
+        # Number of conversions and emitted events of the last run.
+        self.samples = 0
+        self.events = 0
+
+    def run(self, n_events=None, max_samples=None):
+        '''
+        Acquire and yield trigger events.
+
+        Args:
+            n_events:       int/None, stop after this number of events, None means endless.
+            max_samples:    int/None, stop after this number of conversions, None means endless;
+                            a window in progress is emitted with the samples captured so far.
+
+        Returns:
+            generator, yield (trigger_index, timestamps, samples).
+
+        '''
+        assert n_events is None or n_events >= 0
+        assert max_samples is None or max_samples >= 0
+
+        ads8568 = self.ads8568
+        trigger = self.trigger
+        channels = self.channels
+        if trigger.ch not in channels:
+            channels = channels + [trigger.ch]
+        ch_pairs, slots = ads8568._setup_acquisition(channels)
+        # Slot of the trigger channel, extra channel is the last one.
+        trigger_pair, trigger_shift = slots[channels.index(trigger.ch)]
+        slots = slots[:len(self.channels)]
+        trigger.arm(ads8568)
+
+        ring = deque(maxlen=self.pre_samples)
+        window = None
+        remaining = 0
+        self.samples = 0
+        self.events = 0
+        while (n_events is None or self.events < n_events) and (max_samples is None or self.samples < max_samples):
+            timestamp = time.perf_counter_ns()
+            pair_data = ads8568._conv_ch_pair(ch_pairs)
+            self.samples += 1
+            sample = (timestamp, pair_data)
+            fired = trigger.fire((pair_data[trigger_pair] >> trigger_shift) & 0x0000FFFF)
+            if window is not None:
+                window.append(sample)
+                remaining -= 1
+            elif fired:
+                window = list(ring)
+                window_trigger = len(window)
+                window.append(sample)
+                remaining = self.post_samples
+            if window is not None and remaining == 0:
+                self.events += 1
+                yield self._convert(window_trigger, window, slots)
+                window = None
+            ring.append(sample)
+
+        if window is not None:
+            self.events += 1
+            yield self._convert(window_trigger, window, slots)
+
+    def _convert(self, trigger_index, window, slots):
+        tables = [self.ads8568._get_volt_table(ch)[0] for ch in self.channels]
+        timestamps = [timestamp for timestamp, pair_data in window]
+        samples = [[table[(pair_data[index] >> shift) & 0x0000FFFF] for table, (index, shift) in zip(tables, slots)]
+                   for timestamp, pair_data in window]
+        return trigger_index, timestamps, samples
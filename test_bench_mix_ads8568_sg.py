@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+import json
+import pytest
+from mix.driver.smartgiant.common.ipcore import bench_mix_ads8568_sg as bench
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+def test_run_benchmarks():
+    report = bench.run_benchmarks('datasheet', 0.001, ['read_ch', 'scan_ch_8ch', 'stream_2ch'])
+    assert sorted(report['results']) == ['read_ch', 'scan_ch_8ch', 'stream_2ch']
+    metrics = report['results']['scan_ch_8ch']
+    assert metrics['calls'] >= 1
+    assert metrics['bus_per_sample'] > 0
+    assert metrics['sleep_ratio'] + metrics['spin_ratio'] + metrics['python_ratio'] == pytest.approx(1, abs=0.01)
+    json.dumps(report)
+
+
+def test_compare():
+    baseline = {'results': {'read_ch': {'us_per_sample': 10.0}, 'scan_ch_1ch': {'us_per_sample': 10.0}}}
+    report = {'results': {'read_ch': {'us_per_sample': 11.0}, 'scan_ch_1ch': {'us_per_sample': 13.0},
+                          'stream_1ch': {'us_per_sample': 1.0}}}
+    assert bench.compare(baseline, report, 0.2) == [('scan_ch_1ch', 10.0, 13.0)]
+
+
+def test_main(tmpdir):
+    output = str(tmpdir.join('bench.json'))
+    assert bench.main(['--duration', '0.001', '--case', 'read_ch', '--output', output]) == 0
+    assert bench.main(['--duration', '0.001', '--case', 'read_ch', '--baseline', output,
+                       '--threshold', '1000']) == 0
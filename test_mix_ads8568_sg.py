@@ -1,9 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import time
+import asyncio
+import threading
 import pytest
 import mock
 from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SG
 from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGBusyWait
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGInterruptWait
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGTimeoutException
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGTiming
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import precise_delay
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGSampleBuffer
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGStats
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGVoltTable
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGCalibration
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGException
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGScheduler
 
 __author__ = 'jionghao.huang@SmartGiant'
 __version__ = '0.1'
@@ -113,8 +127,17 @@ def test_read_single_ch_data(mix_ads8568_sg, ch_pair):
 
 
 def test_read_all_ch_data(mix_ads8568_sg):
-    with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc') as mock_read_32bit_inc:
-        mix_ads8568_sg.read_all_ch_data()
+    with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                           return_value=[0xA, 0xB, 0xC, 0xD]) as mock_read_32bit_inc:
+        assert mix_ads8568_sg.read_all_ch_data() == [0xA, 0xB, 0xC, 0xD]
+    mock_read_32bit_inc.assert_called_once_with(MIXADS8568SGDef.CHANNEL_A_DATA, 4)
+
+
+def test_read_ch_pair_data(mix_ads8568_sg):
+    with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                           return_value=[0xB, 0xC, 0xD]) as mock_read_32bit_inc:
+        assert mix_ads8568_sg.read_ch_pair_data(['D', 'B']) == [0xD, 0xB]
+    mock_read_32bit_inc.assert_called_once_with(MIXADS8568SGDef.CHANNEL_B_DATA, 3)
 
 
 def test_sel_mode(mix_ads8568_sg, dev_func_mode):
@@ -131,6 +154,7 @@ def test_reset_dev(mix_ads8568_sg):
 
 def test_init_dev(mix_ads8568_sg, dev_func_mode):
     mix_ads8568_sg.init_dev(dev_func_mode)
+    assert mix_ads8568_sg.dev_func_mode == dev_func_mode
 
 
 def test_set_absolute_volt_range(mix_ads8568_sg, dev_func_mode, vrange, ch_pair):
@@ -156,6 +180,15 @@ def test_start_conv(mix_ads8568_sg, ch_pair):
     mix_ads8568_sg.start_conv(ch_pair)
 
 
+def test_start_conv_group(mix_ads8568_sg):
+    mix_ads8568_sg.invalidate()
+    with mock.patch.object(mix_ads8568_sg.convst_a, 'set_level') as mock_convst_a_set_level:
+        with mock.patch.object(mix_ads8568_sg.convst_d, 'set_level') as mock_convst_d_set_level:
+            mix_ads8568_sg.start_conv_group(['A', 'D', 'A'])
+    assert mock_convst_a_set_level.call_args_list == [mock.call(0), mock.call(1), mock.call(0)]
+    assert mock_convst_d_set_level.call_args_list == [mock.call(0), mock.call(1), mock.call(0)]
+
+
 def test__code_2_mvolt(mix_ads8568_sg):
     code = 0x1234FF78
     mix_ads8568_sg._code_2_mvolt(code)
@@ -171,6 +204,429 @@ def test_read_ch(mix_ads8568_sg, ch):
 def test_scan_ch(mix_ads8568_sg):
     ch_list = [1, 2, 3, 4, 5, 6, 7, 8]
     with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
-        with mock.patch.object(mix_ads8568_sg, 'read_single_ch_data',
-                               return_value=0x1234FF78) as mock_read_single_ch_data:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x1234FF78] * 4) as mock_read_32bit_inc:
             mix_ads8568_sg.scan_ch(ch_list)
+    mock_read_32bit_inc.assert_called_once_with(MIXADS8568SGDef.CHANNEL_A_DATA, 4)
+
+
+def test_scan_plan(mix_ads8568_sg):
+    plan = mix_ads8568_sg._get_scan_plan([8, 3, 4])
+    assert plan.ch_pairs == ('D', 'B')
+    assert (plan.addr, plan.rd_len) == (MIXADS8568SGDef.CHANNEL_B_DATA, 3)
+    assert plan.slots == ((2, 0), (0, 16), (0, 0))
+    assert mix_ads8568_sg._get_scan_plan([8, 3, 4]) is plan
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x00010002, 0, 0x00030004]) as mock_read_32bit_inc:
+            volts = mix_ads8568_sg.scan_ch([8, 3, 4])
+    mock_read_32bit_inc.assert_called_once_with(MIXADS8568SGDef.CHANNEL_B_DATA, 3)
+    assert volts == [mix_ads8568_sg._code_2_mvolt(0x00030004, 'D')[1],
+                     mix_ads8568_sg._code_2_mvolt(0x00010002, 'B')[0],
+                     mix_ads8568_sg._code_2_mvolt(0x00010002, 'B')[1]]
+
+
+def test_stream(mix_ads8568_sg):
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x1234FF78] * 4) as mock_read_32bit_inc:
+            blocks = list(mix_ads8568_sg.stream([1, 2, 8], 5, 2))
+    assert [len(block) for block in blocks] == [2, 2, 1]
+    assert all(len(sample) == 3 for block in blocks for sample in block)
+
+
+def test_code_2_volt_batch(mix_ads8568_sg):
+    codes = [0x1234FF78, 0x7FFF8000, 0x00000001]
+    volt0, volt1 = mix_ads8568_sg.code_2_volt_batch(codes)
+    for i, code in enumerate(codes):
+        assert mix_ads8568_sg._code_2_mvolt(code) == pytest.approx([volt0[i], volt1[i]])
+    assert volt0[1] == pytest.approx(mix_ads8568_sg.input_volt_range)
+    assert volt1[1] < 0
+
+
+def test_volt_table():
+    volt_table = MIXADS8568SGVoltTable(max_size=2)
+    table, np_table = volt_table.get(10.0)
+    assert len(table) == 0x10000
+    assert table[0x7FFF] == 10.0
+    assert table[0x8000] == -0x8000 * 10.0 / 0x7FFF
+    assert table[0xFFFF] == -10.0 / 0x7FFF
+    assert volt_table.get(10.0)[0] is table
+    volt_table.get(5.0)
+    volt_table.get(10.0)
+    volt_table.get(6.0)
+    # 5.0 is the least recently used one.
+    assert len(volt_table) == 2
+    assert volt_table.get(10.0)[0] is table
+
+
+def test_volt_table_range_change(mix_ads8568_sg):
+    mix_ads8568_sg.set_absolute_volt_range('hw', '4VREF')
+    volt_4vref = mix_ads8568_sg._code_2_mvolt(0x7FFF0000)[0]
+    mix_ads8568_sg.set_absolute_volt_range('hw', '2VREF')
+    assert mix_ads8568_sg._code_2_mvolt(0x7FFF0000)[0] == volt_4vref / 2
+    assert mix_ads8568_sg.code_2_volt_batch([0x7FFF0000])[0][0] == volt_4vref / 2
+    mix_ads8568_sg.set_absolute_volt_range('hw', '4VREF')
+
+
+def test_pair_volt_range(mix_ads8568_sg):
+    mix_ads8568_sg.set_absolute_volt_range('hw', '4VREF')
+    mix_ads8568_sg.set_absolute_volt_range('sw', '2VREF', 'B')
+    assert mix_ads8568_sg.pair_volt_range['A'] == 2 * mix_ads8568_sg.pair_volt_range['B']
+    volt_a = mix_ads8568_sg._code_2_mvolt(0x7FFF0001, 'A')
+    volt_b = mix_ads8568_sg._code_2_mvolt(0x7FFF0001, 'B')
+    assert volt_a == pytest.approx([2 * volt for volt in volt_b])
+    volt0, volt1 = mix_ads8568_sg.code_2_volt_batch([0x7FFF0001], 'B')
+    assert [volt0[0], volt1[0]] == volt_b
+    mix_ads8568_sg.set_absolute_volt_range('hw', '4VREF')
+
+
+def test_calibration(mix_ads8568_sg, tmpdir):
+    calibration = MIXADS8568SGCalibration()
+    calibration.set(2, 2.0, 0.5)
+    assert calibration.get(2) == (2.0, 0.5)
+    assert calibration.get(1) == (1.0, 0.0)
+    assert list(calibration.apply([1, 2], [[1.0, 1.0], [2.0, -1.0]])[1]) == [2.0, -1.5]
+
+    path = str(tmpdir.join('ads8568.cal'))
+    calibration.save(path)
+    assert MIXADS8568SGCalibration.load(path) == calibration
+    tmpdir.join('bad.cal').write_binary(b'ADS8568K' + b'\0' * 8)
+    with pytest.raises(MIXADS8568SGException):
+        MIXADS8568SGCalibration.load(str(tmpdir.join('bad.cal')))
+
+    raw = mix_ads8568_sg._code_2_mvolt(0x7FFF0001, 'A')
+    mix_ads8568_sg.set_calibration(calibration)
+    assert mix_ads8568_sg._code_2_mvolt(0x7FFF0001, 'A') == pytest.approx([raw[0], raw[1] * 2.0 + 0.5])
+    volt0, volt1 = mix_ads8568_sg.code_2_volt_batch([0x7FFF0001], 'A')
+    assert volt1[0] == pytest.approx(raw[1] * 2.0 + 0.5)
+    mix_ads8568_sg.set_calibration(None)
+    assert mix_ads8568_sg._code_2_mvolt(0x7FFF0001, 'A') == raw
+
+
+def test_config(mix_ads8568_sg):
+    mix_ads8568_sg.reset_dev()
+    with mock.patch.object(mix_ads8568_sg, 'read_config_register') as mock_read_config_register:
+        with mock.patch.object(mix_ads8568_sg, 'write_config_register') as mock_write_config_register:
+            with mix_ads8568_sg.config() as cfg:
+                mix_ads8568_sg.sel_max_vref_output_range(3)
+                mix_ads8568_sg.set_absolute_volt_range('sw', '2VREF', 'B')
+                mix_ads8568_sg.set_inter_vref('sw', 3.0)
+                cfg.clear_bits(MIXADS8568SGDef.SW_ABSOLUTE_VOLT_RANGE['B']['2VREF'])
+    assert not mock_read_config_register.called
+    mock_write_config_register.assert_called_once_with(
+        MIXADS8568SGDef.WR_RD_CONFIG_REG | MIXADS8568SGDef.VREF_3000_MV | MIXADS8568SGDef.INTERNAL_VREF_EN | 0x3FF)
+    assert mix_ads8568_sg.current_config_data == MIXADS8568SGDef.VREF_3000_MV | MIXADS8568SGDef.INTERNAL_VREF_EN | 0x3FF
+
+
+def test_verify_config(mix_ads8568_sg):
+    with mock.patch.object(mix_ads8568_sg, 'read_config_register',
+                           return_value=mix_ads8568_sg.current_config_data) as mock_read_config_register:
+        assert mix_ads8568_sg.verify_config()
+
+
+def test_set_busy_mode(mix_ads8568_sg):
+    with mock.patch.object(mix_ads8568_sg, 'write_config_register') as mock_write_config_register:
+        mix_ads8568_sg.set_busy_mode('interrupt', 'low')
+        assert isinstance(mix_ads8568_sg.wait_strategy, MIXADS8568SGInterruptWait)
+        assert mix_ads8568_sg._conv_done_level == 0
+        mix_ads8568_sg.set_busy_mode('busy', 'high', MIXADS8568SGBusyWait())
+        assert mix_ads8568_sg._conv_done_level == 0
+    assert mock_write_config_register.call_count == 2
+    assert not mix_ads8568_sg.current_config_data & (MIXADS8568SGDef.INTERRUPT_MODE | MIXADS8568SGDef.ACTIVE_LOW)
+
+
+def test_set_busy_mode_hw(mix_ads8568_sg):
+    mix_ads8568_sg.sel_mode('hw')
+    with mock.patch.object(mix_ads8568_sg, 'write_config_register') as mock_write_config_register:
+        mix_ads8568_sg.set_busy_mode('interrupt', 'high')
+        assert mix_ads8568_sg._conv_done_level == 0
+        mix_ads8568_sg.sel_mode('sw')
+        assert mix_ads8568_sg._conv_done_level == 1
+        mix_ads8568_sg.set_busy_mode('busy', 'high')
+    mix_ads8568_sg.sel_mode('hw')
+
+
+def test_busy_wait():
+    busy = mock.Mock()
+    busy.get_level.side_effect = [1, 1, 1, 0]
+    assert MIXADS8568SGBusyWait().wait(busy, 0) == 4
+    busy.get_level.side_effect = None
+    busy.get_level.return_value = 1
+    with pytest.raises(MIXADS8568SGTimeoutException):
+        MIXADS8568SGBusyWait(spin_time=0.001, timeout=0.01).wait(busy, 0)
+
+
+def test_interrupt_wait():
+    int_pin = mock.Mock()
+    int_pin.get_level.return_value = 0
+    wait_strategy = MIXADS8568SGInterruptWait(timeout=0.01, poll_interval=0.001)
+    with pytest.raises(MIXADS8568SGTimeoutException):
+        wait_strategy.wait(int_pin, 1)
+    # A notify left from before the wait does not end it.
+    wait_strategy.notify()
+    with pytest.raises(MIXADS8568SGTimeoutException):
+        wait_strategy.wait(int_pin, 1)
+    wait_strategy.timeout = 1
+    wait_strategy.poll_interval = 1
+    timer = threading.Timer(0.01, wait_strategy.notify)
+    timer.start()
+    assert wait_strategy.wait(int_pin, 1) == 1
+    timer.join()
+
+
+def test_async_wait():
+    pin = mock.Mock()
+    pin.get_level.side_effect = [1, 1, 0]
+
+    async def get_level():
+        return pin.get_level()
+
+    assert asyncio.run(MIXADS8568SGBusyWait(spin_time=0).async_wait(get_level, 0)) == 3
+    pin.get_level.side_effect = None
+    pin.get_level.return_value = 1
+    with pytest.raises(MIXADS8568SGTimeoutException):
+        asyncio.run(MIXADS8568SGBusyWait(spin_time=0.001, timeout=0.01).async_wait(get_level, 0))
+
+    wait_strategy = MIXADS8568SGInterruptWait(timeout=0.01, poll_interval=0.001)
+    wait_strategy.notify()
+    with pytest.raises(MIXADS8568SGTimeoutException):
+        asyncio.run(wait_strategy.async_wait(get_level, 0))
+    wait_strategy.timeout = 1
+    wait_strategy.poll_interval = 1
+    timer = threading.Timer(0.01, wait_strategy.notify)
+    timer.start()
+    assert asyncio.run(wait_strategy.async_wait(get_level, 0)) == 1
+    timer.join()
+    assert wait_strategy._async_waiters == []
+
+
+def test_timing():
+    timing = MIXADS8568SGTiming('datasheet', conv_wait=200)
+    assert timing.conv_wait == 200
+    assert timing.convst_high == MIXADS8568SGDef.TIMING_PROFILE['datasheet']['convst_high']
+    assert MIXADS8568SGTiming().reset_pulse == 1000000
+
+
+def test_precise_delay():
+    start = time.perf_counter_ns()
+    precise_delay(20000)
+    assert time.perf_counter_ns() - start >= 20000
+
+
+def test_invalidate(mix_ads8568_sg):
+    mix_ads8568_sg.invalidate()
+    with mock.patch.object(mix_ads8568_sg.axi4_bus, 'write_8bit_inc') as mock_write_8bit_inc:
+        with mock.patch.object(mix_ads8568_sg.sel_b, 'set_level') as mock_set_level:
+            mix_ads8568_sg._sel_all_ch_pair()
+            mix_ads8568_sg.adc_ch_pair_en(4)
+            mix_ads8568_sg._sel_all_ch_pair()
+            mix_ads8568_sg.adc_ch_pair_en(4)
+            assert mock_write_8bit_inc.call_count == 3
+            assert mock_set_level.call_count == 1
+            mix_ads8568_sg.invalidate()
+            mix_ads8568_sg._sel_all_ch_pair()
+            assert mock_write_8bit_inc.call_count == 5
+            assert mock_set_level.call_count == 2
+
+
+def test_sample_buffer():
+    buffer = MIXADS8568SGSampleBuffer([1, 2], 3)
+    for i in range(5):
+        buffer.append(i, [i, 0xFFFF])
+    assert len(buffer) == 3 and buffer.total == 5
+    timestamps, codes = buffer.read_codes()
+    assert list(timestamps) == [2, 3, 4]
+    assert list(codes[0]) == [2, 3, 4]
+    assert list(codes[1]) == [-1, -1, -1]
+    timestamps, volts = buffer.read(MIXADS8568SGDef.POSITIVE_FULL_SCALE, 2)
+    assert list(volts[0]) == [3, 4]
+    calibration = MIXADS8568SGCalibration()
+    calibration.set(2, 2.0, 0.5)
+    timestamps, volts = buffer.read(MIXADS8568SGDef.POSITIVE_FULL_SCALE, 2, calibration)
+    assert list(volts[0]) == [3, 4]
+    assert list(volts[1]) == [-1.5, -1.5]
+
+
+def test_conv_ch_pair_conv_wait(mix_ads8568_sg):
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x1234FF78]) as mock_read_32bit_inc:
+            with mock.patch('mix.driver.smartgiant.common.ipcore.mix_ads8568_sg.precise_delay') as mock_delay:
+                mix_ads8568_sg._conv_ch_pair(['A'])
+    # CONVST low, CONVST high, then the conversion wait of the timing profile.
+    assert mock_delay.call_args_list[-1] == mock.call(mix_ads8568_sg.timing.conv_wait)
+
+
+def test_acquire(mix_ads8568_sg):
+    buffer = MIXADS8568SGSampleBuffer([2, 1, 8], 10)
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x12345678, 0, 0, 0x0001FFFF]) as mock_read_32bit_inc:
+            mix_ads8568_sg.acquire(buffer, 4)
+    timestamps, codes = buffer.read_codes()
+    assert len(timestamps) == 4
+    assert list(codes[0]) == [0x5678] * 4
+    assert list(codes[1]) == [0x1234] * 4
+    assert list(codes[2]) == [-1] * 4
+
+
+@pytest.fixture(params=['block', 'drop_oldest', 'drop_newest'])
+def policy(request):
+    return request.param
+
+
+def test_background_acquisition(mix_ads8568_sg, policy):
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x1234FF78] * 4) as mock_read_32bit_inc:
+            acq = mix_ads8568_sg.start_background_acquisition([1, 4], None, 2, 2, policy)
+            timestamps, samples = acq.get(timeout=1)
+            acq.stop(timeout=1)
+    assert not acq.is_running()
+    assert len(timestamps) == len(samples) == 2
+    assert len(samples[0]) == 2
+
+
+def test_background_acquisition_setup_error(mix_ads8568_sg):
+    error = MIXADS8568SGException('setup failed')
+    with mock.patch.object(mix_ads8568_sg, '_setup_acquisition', side_effect=error) as mock_setup_acquisition:
+        acq = mix_ads8568_sg.start_background_acquisition([1, 4])
+        acq.join(timeout=1)
+    assert not acq.is_running()
+    assert acq.error is error
+    with pytest.raises(MIXADS8568SGException):
+        acq.stop(timeout=1)
+
+
+def test_aread_ch(mix_ads8568_sg, ch):
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x1234FF78] * 4) as mock_read_32bit_inc:
+            volt = asyncio.run(mix_ads8568_sg.aread_ch(ch))
+    assert volt == mix_ads8568_sg._code_2_mvolt(0x1234FF78, MIXADS8568SGDef.CHANNEL[ch])[0 if ch % 2 else 1]
+
+
+def test_aread_ch_wait_strategy(mix_ads8568_sg):
+    unlocked = []
+
+    def try_lock():
+        if mix_ads8568_sg.bus_lock.acquire(False):
+            mix_ads8568_sg.bus_lock.release()
+            unlocked.append(True)
+
+    async def async_wait(get_level, done_level):
+        # The bus lock is free while the conversion is waited for.
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        assert await get_level() == done_level
+        return 1
+
+    wait_strategy = mix_ads8568_sg.wait_strategy
+    mix_ads8568_sg.wait_strategy = mock.Mock(async_wait=mock.Mock(side_effect=async_wait))
+    try:
+        with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+            with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                                   return_value=[0x1234FF78]) as mock_read_32bit_inc:
+                asyncio.run(mix_ads8568_sg.aread_ch(1))
+        assert mix_ads8568_sg.wait_strategy.async_wait.called
+        assert not mix_ads8568_sg.wait_strategy.wait.called
+    finally:
+        mix_ads8568_sg.wait_strategy = wait_strategy
+    assert unlocked == [True]
+
+
+def test_ascan_ch(mix_ads8568_sg):
+    ch_list = [1, 2, 3, 4, 5, 6, 7, 8]
+
+    async def scan_twice():
+        return await asyncio.gather(mix_ads8568_sg.ascan_ch(ch_list), mix_ads8568_sg.ascan_ch(ch_list))
+
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x1234FF78] * 4) as mock_read_32bit_inc:
+            results = asyncio.run(scan_twice())
+    assert results[0] == results[1]
+    assert len(results[0]) == 8
+
+
+def test_stats(mix_ads8568_sg):
+    assert mix_ads8568_sg.stats() == {'counters': {}, 'histograms': {}}
+    axi4_bus = mix_ads8568_sg.axi4_bus
+    busy = mix_ads8568_sg.busy
+    events = []
+    mix_ads8568_sg.enable_stats().add_sink(lambda kind, name, value: events.append((kind, name)))
+    try:
+        with mock.patch.object(busy, 'get_level', return_value=0) as mock_get_level:
+            with mock.patch.object(axi4_bus, 'read_32bit_inc', return_value=[0x1234FF78] * 4) as mock_read_32bit_inc:
+                mix_ads8568_sg.scan_ch([1, 2, 3])
+        stats = mix_ads8568_sg.stats(reset=True)
+    finally:
+        mix_ads8568_sg.disable_stats()
+    assert mix_ads8568_sg.axi4_bus is axi4_bus
+    assert mix_ads8568_sg.busy is busy
+    counters = stats['counters']
+    assert counters['conversions'] == 2
+    assert counters['bus.read_32bit_inc.0x24'] == 1
+    assert counters['busy_wait.polls'] == 1
+    assert counters['gpio.busy.get_level'] == 1
+    assert counters['gpio.convst_a.set_level'] == 3
+    assert stats['histograms']['busy_wait']['count'] == 1
+    assert stats['histograms']['bus.read_32bit_inc']['count'] == 1
+    assert ('count', 'conversions') in events
+
+
+def test_stats_histogram():
+    stats = MIXADS8568SGStats()
+    for latency in [1, 3, 1000]:
+        stats.observe('x', latency)
+    hist = stats.snapshot()['histograms']['x']
+    assert hist['count'] == 3 and hist['min_ns'] == 1 and hist['max_ns'] == 1000
+    assert hist['buckets'] == {2: 1, 4: 1, 1024: 1}
+
+
+def test_scan_ch_stats(mix_ads8568_sg):
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               side_effect=[[0x0001FFFF], [0x0003FFFD]]) as mock_read_32bit_inc:
+            stats = mix_ads8568_sg.scan_ch_stats([1, 2], 2)
+    lsb = mix_ads8568_sg.pair_volt_range['A'] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    assert stats[0]['mean'] == pytest.approx(2 * lsb)
+    assert stats[0]['min'] == pytest.approx(1 * lsb)
+    assert stats[0]['max'] == pytest.approx(3 * lsb)
+    assert stats[0]['std'] == pytest.approx(1 * lsb)
+    assert stats[1]['mean'] == pytest.approx(-2 * lsb)
+    assert stats[1]['rms'] == pytest.approx(5 ** 0.5 * lsb)
+
+
+def test_read_ch_averaged(mix_ads8568_sg, ch):
+    with mock.patch.object(mix_ads8568_sg.busy, 'get_level', return_value=0) as mock_get_level:
+        with mock.patch.object(mix_ads8568_sg.axi4_bus, 'read_32bit_inc',
+                               return_value=[0x1234FF78] * 4) as mock_read_32bit_inc:
+            volt = mix_ads8568_sg.read_ch_averaged(ch, 4)
+    pair_volt = mix_ads8568_sg._code_2_mvolt(0x1234FF78, MIXADS8568SGDef.CHANNEL[ch])
+    assert volt == pytest.approx(pair_volt[0 if ch % 2 else 1])
+
+
+def test_scheduler_skip(mix_ads8568_sg):
+    clock = [0]
+
+    def advance(ns):
+        clock[0] += max(int(ns), 0)
+
+    def conv_ch_pair(ch_pairs):
+        # Every conversion takes 1.7 periods.
+        advance(1700000)
+        return [0]
+
+    scheduler = MIXADS8568SGScheduler(mix_ads8568_sg, [1], 1000, 'skip')
+    with mock.patch.object(mix_ads8568_sg, '_setup_acquisition', return_value=(['A'], [(0, 16)])):
+        with mock.patch.object(mix_ads8568_sg, '_conv_ch_pair', side_effect=conv_ch_pair):
+            with mock.patch('mix.driver.smartgiant.common.ipcore.mix_ads8568_sg.precise_delay', side_effect=advance):
+                with mock.patch.object(time, 'perf_counter_ns', side_effect=lambda: clock[0]):
+                    timestamps, samples = scheduler.run(3)
+    # The third deadline is 1.4 periods late, it and the next one are dropped.
+    assert list(timestamps) == [0, 1700000, 4000000]
+    assert scheduler.missed == 2
+    assert scheduler.lateness[2] == 0
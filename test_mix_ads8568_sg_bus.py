@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import pytest
+import mock
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SG
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_bus import MIXADS8568SGRegisterBackend
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_bus import MIXADS8568SGPostedWriteBus
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_bus import MIXADS8568SGMmapBus
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_bus import MIXADS8568SGMmapBusDef
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+@pytest.fixture
+def posted_bus():
+    return MIXADS8568SGPostedWriteBus(mock.Mock(spec=['read_32bit_inc', 'write_8bit_inc', 'write_32bit_inc']))
+
+
+def test_flush(posted_bus):
+    posted_bus.write_8bit_inc(MIXADS8568SGDef.ADS8568_SEL_CD, [1])
+    posted_bus.write_8bit_inc(MIXADS8568SGDef.MODULE_STATUS, [0])
+    posted_bus.write_8bit_inc(MIXADS8568SGDef.MODULE_STATUS, [1])
+    posted_bus.write_8bit_inc(MIXADS8568SGDef.ADS8568_SEL_B, [1])
+    posted_bus.write_32bit_inc(MIXADS8568SGDef.ADC_SPI_RATE, [0x1234])
+    assert posted_bus.pending() == 4
+    assert not posted_bus.axi4_bus.write_8bit_inc.called
+    assert posted_bus.flush() == 2
+    posted_bus.axi4_bus.write_8bit_inc.assert_called_once_with(MIXADS8568SGDef.MODULE_STATUS, [1, 1, 1])
+    posted_bus.axi4_bus.write_32bit_inc.assert_called_once_with(MIXADS8568SGDef.ADC_SPI_RATE, [0x1234])
+    assert posted_bus.flush() == 0
+
+
+def test_register_backend(posted_bus):
+    assert isinstance(posted_bus, MIXADS8568SGRegisterBackend)
+    with pytest.raises(TypeError):
+        MIXADS8568SGRegisterBackend()
+
+
+def test_read_after_write(posted_bus):
+    posted_bus.write_8bit_inc(MIXADS8568SGDef.ADC_CHANNEL_EN, [4])
+    posted_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_A_DATA, 4)
+    assert posted_bus.pending() == 0
+    assert posted_bus.axi4_bus.method_calls[0] == mock.call.write_8bit_inc(MIXADS8568SGDef.ADC_CHANNEL_EN, [4])
+
+
+def test_volatile_register(posted_bus):
+    posted_bus.write_8bit_inc(MIXADS8568SGDef.MODULE_STATUS, [1])
+    posted_bus.write_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, [0x3FF])
+    posted_bus.write_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, [0x3FF])
+    assert posted_bus.axi4_bus.method_calls == [
+        mock.call.write_8bit_inc(MIXADS8568SGDef.MODULE_STATUS, [1]),
+        mock.call.write_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, [0x3FF]),
+        mock.call.write_32bit_inc(MIXADS8568SGDef.SPI_NORMAL_DATA, [0x3FF])]
+
+
+def test_driver_setup(posted_bus):
+    pins = [mock.Mock() for i in range(16)]
+    ads8568 = MIXADS8568SG(posted_bus, *pins)
+    ads8568.init_dev('sw')
+    ads8568.set_spi_speed(10000000)
+    ads8568.sel_b_ch('enable')
+    ads8568.sel_cd_ch('enable')
+    ads8568.adc_ch_pair_en(4)
+    ads8568.start_conv('A')
+    assert len(posted_bus.axi4_bus.method_calls) == 3
+
+
+def test_mmap_bus_file(tmpdir):
+    path = tmpdir.join('regs')
+    path.write_binary(b'\0' * MIXADS8568SGMmapBusDef.REG_SIZE)
+    with MIXADS8568SGMmapBus(str(path)) as axi4_bus:
+        axi4_bus.write_8bit_inc(MIXADS8568SGDef.MODULE_STATUS, [1, 0, 1])
+        axi4_bus.write_32bit_inc(MIXADS8568SGDef.CHANNEL_A_DATA, [0x1234FF78, 0x7FFF8000])
+        assert list(axi4_bus.read_8bit_inc(MIXADS8568SGDef.MODULE_STATUS, 3)) == [1, 0, 1]
+        rd_data = axi4_bus.read_32bit_inc(MIXADS8568SGDef.CHANNEL_A_DATA, 2)
+        assert list(rd_data) == [0x1234FF78, 0x7FFF8000]
+        rd_data.release()
+    data = path.read_binary()
+    assert data[MIXADS8568SGDef.CHANNEL_B_DATA:MIXADS8568SGDef.CHANNEL_B_DATA + 4] == b'\x00\x80\xff\x7f'
+
+
+def test_mmap_bus_shared_memory():
+    shared_memory = pytest.importorskip('multiprocessing.shared_memory')
+    shm = shared_memory.SharedMemory(create=True, size=MIXADS8568SGMmapBusDef.REG_SIZE)
+    try:
+        axi4_bus = MIXADS8568SGMmapBus(shm.buf)
+        pins = [mock.Mock() for i in range(16)]
+        ads8568 = MIXADS8568SG(axi4_bus, *pins)
+        # Another mapping of the same window plays the ipcore.
+        ipcore = MIXADS8568SGMmapBus(shm.buf)
+        ipcore.write_32bit_inc(MIXADS8568SGDef.CHANNEL_A_DATA, [1, 2, 3, 4])
+        assert ads8568.read_ch_pair_data(['D', 'B']) == [4, 2]
+        assert ads8568.read_single_ch_data('C') == 3
+        ads8568.sel_b_ch('enable')
+        assert ipcore.read_8bit_inc(MIXADS8568SGDef.ADS8568_SEL_B, 1)[0] == 1
+        axi4_bus.close()
+        ipcore.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_async_conversion_flushes(posted_bus):
+    pins = [mock.Mock() for i in range(16)]
+    ads8568 = MIXADS8568SG(posted_bus, *pins)
+    posted_bus.axi4_bus.read_32bit_inc.return_value = [0x1234FF78]
+    ads8568.busy.get_level.return_value = 0
+    pending = []
+    ads8568.convst_b.set_level.side_effect = lambda level: pending.append(posted_bus.pending())
+    asyncio.run(ads8568.aread_ch(3))
+    # Channel pair selection reached the bus before CONVST B moved.
+    assert pending and not any(pending)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGException
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGTiming
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGCalibration
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_sim import MIXADS8568SGSim
+from mix.driver.smartgiant.common.ipcore import mix_ads8568_sg_capture
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_capture import MIXADS8568SGCaptureWriter
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_capture import MIXADS8568SGCaptureReader
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+@pytest.fixture
+def ads8568():
+    sim = MIXADS8568SGSim()
+    for ch in MIXADS8568SGDef.CHANNEL:
+        sim.set_input(ch, ch * 0.5 - 2.25)
+    ads8568 = sim.create_driver(timing=MIXADS8568SGTiming('datasheet'))
+    ads8568.init_dev('sw')
+    return ads8568
+
+
+def test_write_read(ads8568, tmpdir):
+    path = str(tmpdir.join('run.cap'))
+    with MIXADS8568SGCaptureWriter(path, ads8568, ['A', 'D'], grow_records=7) as writer:
+        writer.capture(20)
+        writer.append(123, [0x7FFF8000, 0])
+    with MIXADS8568SGCaptureReader(path) as reader:
+        assert len(reader) == 21
+        assert reader.info['dev_func_mode'] == 'sw'
+        assert reader.input_volt_range == ads8568.input_volt_range
+        assert reader.record(20) == (123, (0x7FFF8000, 0))
+        timestamp, pair_data = reader.record(0)
+        assert pair_data[1] == ads8568.read_single_ch_data('D')
+        if mix_ads8568_sg_capture.np is not None:
+            assert list(reader.timestamps[:20]) == sorted(reader.timestamps[:20])
+            lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+            assert reader.volts(2, 0, 20) == pytest.approx([-1.25] * 20, abs=lsb)
+            assert reader.volts(7, 0, 20) == pytest.approx([1.25] * 20, abs=lsb)
+            assert list(reader.codes(1, 20)) == [0x7FFF]
+            assert list(reader.codes(2, 20)) == [-0x8000]
+            assert reader.pair_data('D')[20] == 0
+
+
+def test_calibration(ads8568, tmpdir):
+    path = str(tmpdir.join('cal.cap'))
+    calibration = MIXADS8568SGCalibration()
+    calibration.set(7, 2.0, 0.5)
+    ads8568.set_calibration(calibration)
+    with MIXADS8568SGCaptureWriter(path, ads8568, ['D']) as writer:
+        writer.capture(5)
+    with MIXADS8568SGCaptureReader(path) as reader:
+        assert reader.calibration == calibration
+        if mix_ads8568_sg_capture.np is not None:
+            lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+            assert reader.volts(7) == pytest.approx([1.25 * 2.0 + 0.5] * 5, abs=2 * lsb)
+            assert reader.volts(8) == pytest.approx([1.75] * 5, abs=lsb)
+
+
+def test_not_capture_file(tmpdir):
+    path = tmpdir.join('bad.cap')
+    path.write_binary(b'\0' * 64)
+    with pytest.raises(MIXADS8568SGException):
+        MIXADS8568SGCaptureReader(str(path))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import mock
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SG
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_bus import MIXADS8568SGPostedWriteBus
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_orchestrator import MIXADS8568SGOrchestrator
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+def create_device(axi4_bus, pair_data):
+    axi4_bus.read_32bit_inc.return_value = pair_data
+    pins = [mock.Mock() for i in range(16)]
+    device = MIXADS8568SG(axi4_bus, *pins)
+    device.busy.get_level.return_value = 0
+    return device
+
+
+@pytest.fixture(scope='module')
+def devices():
+    bus0 = mock.Mock()
+    bus1 = mock.Mock()
+    return [create_device(bus0, [0x00010002] * 4), create_device(bus1, [0x00030004] * 4),
+            create_device(bus0, [0x00050006] * 4)]
+
+
+def test_groups(devices):
+    with MIXADS8568SGOrchestrator(devices) as orchestrator:
+        assert orchestrator.groups == [[0, 2], [1]]
+
+
+def test_groups_wrapped_bus():
+    bus = mock.Mock()
+    devices = [create_device(bus, [0] * 4), create_device(bus, [0] * 4)]
+    devices[0].enable_stats()
+    devices[1].axi4_bus = MIXADS8568SGPostedWriteBus(bus)
+    with MIXADS8568SGOrchestrator(devices) as orchestrator:
+        assert orchestrator.groups == [[0, 1]]
+
+
+def test_scan(devices):
+    with MIXADS8568SGOrchestrator(devices) as orchestrator:
+        result = orchestrator.scan([1, 2])
+        assert [(row[0], row[1]) for row in result] == [(0, 1), (0, 2), (1, 1), (1, 2), (2, 1), (2, 2)]
+        assert result[3][3] == devices[1]._code_2_mvolt(0x00030004)[1]
+
+        result = orchestrator.scan({2: [8]})
+        assert len(result) == 1
+        assert result[0][0] == 2 and result[0][1] == 8
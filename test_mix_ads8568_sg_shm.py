@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import multiprocessing
+import pytest
+import mock
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGTiming
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_sim import MIXADS8568SGSim
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_shm import MIXADS8568SGShmProducer
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_shm import MIXADS8568SGShmConsumer
+from mix.driver.smartgiant.common.ipcore import mix_ads8568_sg_shm
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+@pytest.fixture
+def ads8568():
+    sim = MIXADS8568SGSim()
+    for ch in MIXADS8568SGDef.CHANNEL:
+        sim.set_input(ch, ch * 0.5 - 2.25)
+    ads8568 = sim.create_driver(timing=MIXADS8568SGTiming('datasheet'))
+    ads8568.init_dev('sw')
+    return ads8568
+
+
+def consume(name, results):
+    consumer = MIXADS8568SGShmConsumer(name)
+    count = 0
+    total = 0.0
+    while not consumer.finished():
+        seq, timestamps, data = consumer.read()
+        count += len(timestamps)
+        total += sum(consumer.volts(7, data))
+    results.put((count, total, consumer.lost))
+    del timestamps, data
+    consumer.close()
+
+
+def test_ring(ads8568):
+    with MIXADS8568SGShmProducer(ads8568, ['A', 'D'], capacity=8) as producer:
+        consumer = MIXADS8568SGShmConsumer(producer.name)
+        producer.capture(5)
+        seq, timestamps, data = consumer.read()
+        assert seq == 0
+        assert len(timestamps) == 5
+        assert list(timestamps) == sorted(timestamps)
+        assert list(data[0]) == ads8568.read_ch_pair_data(['A', 'D'])
+        lsb = ads8568.pair_volt_range['A'] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+        assert list(consumer.volts(2, data)) == pytest.approx([-1.25] * 5, abs=lsb)
+        assert list(consumer.volts(7, data)) == pytest.approx([1.25] * 5, abs=lsb)
+
+        producer.capture(6)
+        # Ring end, then wrap-around.
+        seq, timestamps, data = consumer.read()
+        assert (seq, len(timestamps)) == (5, 3)
+        seq, timestamps, data = consumer.read(max_records=2)
+        assert (seq, len(timestamps)) == (8, 2)
+        assert not consumer.overwritten(seq)
+
+        producer.capture(20)
+        assert consumer.overwritten(seq)
+        seq, timestamps, data = consumer.read()
+        assert consumer.lost == 31 - 7 - 10
+        assert seq == 24
+        assert not consumer.finished()
+        del timestamps, data
+        producer.close()
+        consumer.read()
+        assert consumer.finished()
+        consumer.close()
+
+
+def test_ring_lagging_consumer(ads8568):
+    with MIXADS8568SGShmProducer(ads8568, ['A'], capacity=4) as producer:
+        consumer = MIXADS8568SGShmConsumer(producer.name)
+        producer.capture(4)
+        # One full ring behind, the slot of record 0 is the one the producer writes next.
+        assert consumer.overwritten(0)
+        seq, timestamps, data = consumer.read()
+        assert (seq, len(timestamps), consumer.lost) == (1, 3, 1)
+        del timestamps, data
+        consumer.close()
+
+
+def test_resource_tracker(ads8568):
+    with MIXADS8568SGShmProducer(ads8568, ['A'], capacity=4) as producer:
+        with mock.patch.object(mix_ads8568_sg_shm.resource_tracker, 'unregister') as mock_unregister:
+            # The producer's tracker is shared, its registration is kept.
+            MIXADS8568SGShmConsumer(producer.name).close()
+            assert not mock_unregister.called
+            with mock.patch.object(mix_ads8568_sg_shm, '_tracker_id', return_value=[0, 0]):
+                MIXADS8568SGShmConsumer(producer.name).close()
+            assert mock_unregister.called == (sys.version_info < (3, 13))
+
+
+def test_consumer_process(ads8568):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    with MIXADS8568SGShmProducer(ads8568, ['D'], capacity=1024) as producer:
+        process = context.Process(target=consume, args=(producer.name, results))
+        process.start()
+        producer.capture(200)
+        producer.close()
+        count, total, lost = results.get(timeout=10)
+        process.join(timeout=10)
+    assert process.exitcode == 0
+    assert count + lost == 200
+    lsb = ads8568.pair_volt_range['D'] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    assert total == pytest.approx(1.25 * count, abs=lsb * count)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGException
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGTiming
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_sim import MIXADS8568SGSim
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_sim import sine_wave
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+@pytest.fixture
+def sim():
+    sim = MIXADS8568SGSim()
+    for ch in MIXADS8568SGDef.CHANNEL:
+        sim.set_input(ch, ch * 0.5 - 2.25)
+    return sim
+
+
+@pytest.fixture
+def ads8568(sim):
+    ads8568 = sim.create_driver(timing=MIXADS8568SGTiming('datasheet'))
+    ads8568.init_dev('sw')
+    return ads8568
+
+
+def test_read_ch(ads8568):
+    lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    for ch in MIXADS8568SGDef.CHANNEL:
+        assert ads8568.read_ch(ch) == pytest.approx(ch * 0.5 - 2.25, abs=lsb)
+
+
+def test_read_all_ch_data(sim, ads8568):
+    ads8568.scan_ch([1, 3, 5, 7])
+    read_count = sim.bus.read_count
+    pair_data = ads8568.read_all_ch_data()
+    assert sim.bus.read_count == read_count + 1
+    assert pair_data == [sim.pair_data[MIXADS8568SGDef.CHANNEL_PAIR[pair]] for pair in 'ABCD']
+
+
+def test_config(sim, ads8568):
+    with ads8568.config():
+        ads8568.sel_max_vref_output_range(3)
+        ads8568.set_absolute_volt_range('sw', '2VREF', 'A')
+    assert sim.config == ads8568.current_config_data
+    assert sim.input_volt_range('A') == 6.0
+    assert ads8568.verify_config()
+    ads8568.write_config_register(MIXADS8568SGDef.CONFIG_DEFAULT)
+    assert sim.config == ads8568.current_config_data
+    ads8568.reset_dev()
+    assert sim.config == MIXADS8568SGDef.CONFIG_DEFAULT
+
+
+def test_reset_dev_range(sim, ads8568):
+    ads8568.set_absolute_volt_range('sw', '2VREF', 'B')
+    ads8568.reset_dev()
+    assert ads8568.pair_volt_range['B'] == 10.0
+    lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    assert ads8568.read_ch(3) == pytest.approx(-0.75, abs=lsb)
+
+
+def test_interrupt_mode(sim, ads8568):
+    ads8568.set_busy_mode('interrupt', 'low')
+    assert sim.pins['busy'].get_level() == 1
+    lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    assert ads8568.read_ch(8) == pytest.approx(1.75, abs=lsb)
+
+
+def test_reset_dev_busy_mode(sim, ads8568):
+    ads8568.set_busy_mode('interrupt', 'high')
+    ads8568.reset_dev()
+    assert ads8568.busy_mode == 'busy' and ads8568._conv_done_level == 0
+    sim.set_input(8, -2.0)
+    lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    assert ads8568.read_ch(8) == pytest.approx(-2.0, abs=lsb)
+
+
+def test_sine_input(sim, ads8568):
+    sim.set_input(2, sine_wave(1.0, 1000))
+    volts = [sample[0] for block in ads8568.stream([2], 200) for sample in block]
+    assert max(volts) <= 1.0 + 0.001
+    assert min(volts) >= -1.0 - 0.001
+    assert sim.conversion_count >= 200
+
+
+def test_disabled_ipcore(sim, ads8568):
+    ads8568.ctrl_dev('disable')
+    ads8568.read_ch(1)
+    assert ads8568.read_single_ch_data('A') == 0
+
+
+def test_scan_ch_stats(sim, ads8568):
+    lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    sim.set_input(3, sine_wave(2.0, 997))
+    stats = ads8568.scan_ch_stats([1, 3], 400)
+    assert stats[0]['mean'] == pytest.approx(-1.75, abs=lsb)
+    assert stats[0]['std'] == pytest.approx(0, abs=lsb)
+    assert stats[0]['rms'] == pytest.approx(1.75, abs=lsb)
+    assert stats[1]['min'] >= -2.0 - lsb
+    assert stats[1]['max'] <= 2.0 + lsb
+    assert stats[1]['max'] > stats[1]['mean'] > stats[1]['min']
+    assert ads8568.read_ch_averaged(8, 16) == pytest.approx(1.75, abs=lsb)
+
+
+def test_mixed_range(sim, ads8568):
+    ads8568.set_absolute_volt_range('sw', '2VREF', 'B')
+    assert sim.input_volt_range('B') == ads8568.pair_volt_range['B'] == 5.0
+    assert sim.input_volt_range('A') == ads8568.pair_volt_range['A'] == 10.0
+    lsb = ads8568.pair_volt_range['A'] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    assert ads8568.scan_ch([1, 3, 5]) == pytest.approx([-1.75, -0.75, 0.25], abs=lsb)
+    assert ads8568.read_ch(3) == pytest.approx(-0.75, abs=lsb)
+
+
+def test_max_sample_rate(ads8568):
+    rate = ads8568.max_sample_rate([1])
+    ads8568.set_spi_speed(10000000)
+    assert ads8568.spi_speed == 10000000
+    assert ads8568.max_sample_rate([1]) < rate
+    assert ads8568.max_sample_rate([1, 3]) < ads8568.max_sample_rate([1, 2])
+    ads8568.timing = MIXADS8568SGTiming()
+    with pytest.raises(MIXADS8568SGException):
+        ads8568.scheduler([1, 2, 3, 4], 1000)
+    with pytest.raises(MIXADS8568SGException):
+        ads8568.start_background_acquisition([1], 1000)
+
+
+@pytest.mark.parametrize('overrun', ['skip', 'catch_up'])
+def test_scheduler(ads8568, overrun):
+    ads8568.set_spi_speed(10000000)
+    scheduler = ads8568.scheduler([1, 2, 3, 4], 500, overrun)
+    timestamps, samples = scheduler.run(50)
+    assert len(timestamps) == len(samples) == 50
+    assert samples[0] == pytest.approx([-1.75, -1.25, -0.75, -0.25], abs=0.01)
+    report = scheduler.report()
+    assert report['samples'] == 50
+    assert report['rate'] == pytest.approx(500, rel=0.2)
+    assert report['jitter_ns']['p50'] <= report['jitter_ns']['p99'] <= report['jitter_ns']['max']
+    assert report['missed'] >= 0
+
+
+def test_scheduler_overrun(ads8568):
+    ads8568.set_spi_speed(10000000)
+    scheduler = ads8568.scheduler([1], 2000, 'skip')
+    # Every conversion takes longer than the period.
+    ads8568.timing.convst_high = 1000000
+    timestamps, samples = scheduler.run(5)
+    assert scheduler.report()['missed'] > 0
+
+
+def test_scan_ch(ads8568):
+    lsb = ads8568.input_volt_range / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+    ch_list = [8, 7, 6, 5, 4, 3, 2, 1]
+    assert ads8568.scan_ch(ch_list) == pytest.approx([ch * 0.5 - 2.25 for ch in ch_list], abs=lsb)
+    assert ads8568.scan_ch([4, 4]) == pytest.approx([-0.25, -0.25], abs=lsb)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGDef
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg import MIXADS8568SGTiming
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_sim import MIXADS8568SGSim
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_trigger import MIXADS8568SGTrigger
+from mix.driver.smartgiant.common.ipcore.mix_ads8568_sg_trigger import MIXADS8568SGTriggeredCapture
+
+__author__ = 'jionghao.huang@SmartGiant'
+__version__ = '0.1'
+
+
+def sequence(values):
+    # Waveform returning the next value on every conversion, the last one is held.
+    values = list(values)
+
+    def waveform(t):
+        return values.pop(0) if len(values) > 1 else values[0]
+    return waveform
+
+
+@pytest.fixture
+def sim():
+    sim = MIXADS8568SGSim()
+    for ch in MIXADS8568SGDef.CHANNEL:
+        sim.set_input(ch, ch * 0.5 - 2.25)
+    return sim
+
+
+@pytest.fixture
+def ads8568(sim):
+    ads8568 = sim.create_driver(timing=MIXADS8568SGTiming('datasheet'))
+    ads8568.init_dev('sw')
+    return ads8568
+
+
+def lsb(ads8568, ch):
+    return ads8568.pair_volt_range[MIXADS8568SGDef.CHANNEL[ch]] / MIXADS8568SGDef.POSITIVE_FULL_SCALE
+
+
+@pytest.mark.parametrize('trigger, codes, fired', [
+    (MIXADS8568SGTrigger(1, 'level', level=1.0), [0, 0x7FFF, 0xFFFF], [False, True, False]),
+    (MIXADS8568SGTrigger(1, 'level', level=0.0, slope='falling'), [0x8000, 1, 0], [True, False, True]),
+    (MIXADS8568SGTrigger(1, 'edge', level=0.0), [0xFFFF, 10, 20, 0xFFFF, 10], [False, True, False, False, True]),
+    (MIXADS8568SGTrigger(1, 'edge', level=0.0, slope='either'), [0xFFFF, 10, 0xFFFF], [False, True, True]),
+    (MIXADS8568SGTrigger(1, 'window', low=-1.0, high=1.0), [0, 0x7FFF, 0x8000], [False, True, True]),
+    (MIXADS8568SGTrigger(1, 'window', low=-1.0, high=1.0, window='inside'), [0, 0x7FFF], [True, False]),
+])
+def test_trigger_fire(ads8568, trigger, codes, fired):
+    trigger.arm(ads8568)
+    assert [trigger.fire(code) for code in codes] == fired
+
+
+def test_edge_capture(sim, ads8568):
+    sim.set_input(1, sequence([0, 0, 0, 1, 1, 1, 0, 0, 0, 1, 1, 1, 0]))
+    trigger = MIXADS8568SGTrigger(1, 'edge', level=0.5)
+    capture = MIXADS8568SGTriggeredCapture(ads8568, [1, 4], trigger, 2, 2)
+    events = list(capture.run(max_samples=20))
+    assert capture.samples == 20
+    assert len(events) == 2
+    for trigger_index, timestamps, samples in events:
+        assert trigger_index == 2
+        assert len(timestamps) == len(samples) == 5
+        assert timestamps == sorted(timestamps)
+        assert [sample[0] for sample in samples] == pytest.approx([0, 0, 1, 1, 1], abs=lsb(ads8568, 1))
+        assert [sample[1] for sample in samples] == pytest.approx([-0.25] * 5, abs=lsb(ads8568, 4))
+
+
+def test_capture_trigger_channel_not_acquired(sim, ads8568):
+    sim.set_input(7, sequence([0, 2.0, 0]))
+    trigger = MIXADS8568SGTrigger(7, 'window', low=-1.0, high=1.0)
+    capture = MIXADS8568SGTriggeredCapture(ads8568, [2], trigger, 5, 3)
+    trigger_index, timestamps, samples = next(capture.run(n_events=1))
+    # Trigger fires on the second conversion, the ring only holds one sample.
+    assert trigger_index == 1
+    assert len(samples) == 5
+    assert all(len(sample) == 1 for sample in samples)
+
+
+def test_capture_truncated(sim, ads8568):
+    trigger = MIXADS8568SGTrigger(1, 'level', level=-2.0)
+    capture = MIXADS8568SGTriggeredCapture(ads8568, [1], trigger, 0, 10)
+    events = list(capture.run(max_samples=4))
+    assert len(events) == 1
+    trigger_index, timestamps, samples = events[0]
+    assert trigger_index == 0
+    assert len(samples) == 4